@@ -0,0 +1,38 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+
+def setup_django() -> None:
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "books.settings")
+    django.setup()
+
+
+@contextmanager
+def test_database(keepdb: bool = False) -> Iterator[None]:
+    #  benchmarks run in a throwaway database, never in the real one;
+    #  `keepdb` keeps it (and its data) for the next run
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    #  test mirrors such as the replica alias point at the test database;
+    #  nothing is serialized for TransactionTestCase rollbacks, which
+    #  would read every row of a kept database
+    old_config = setup_databases(
+        verbosity=0,
+        interactive=False,
+        keepdb=keepdb,
+        serialized_aliases=(),
+    )
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
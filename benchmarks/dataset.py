@@ -0,0 +1,197 @@
+"""
+Synthetic catalogue for benchmarks, reproducible from a seed: users,
+books and reader relations where a few books get most of the readers
+(Zipf-like popularity). Rows are streamed in batches, with COPY on
+PostgreSQL and bulk_create elsewhere, and the book counters and ratings
+are filled in directly instead of being recounted.
+
+    from benchmarks.dataset import generate
+    generate(books=100_000, users=50_000, relations=5_000_000)
+"""
+
+import random
+import time
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, Iterator
+
+WORDS = (
+    "silent lost red last hidden broken golden winter northern secret "
+    "river garden city house night ocean empire forest letter shadow"
+).split()
+RATES = (1, 2, 3, 4, 5)
+RATE_WEIGHTS = (1, 1, 2, 4, 4)
+USER_FIELDS = (
+    "id username password first_name last_name email is_staff is_superuser "
+    "is_active date_joined"
+).split()
+BOOK_FIELDS = (
+    "id name price author_name owner_id rating likes_count bookmarks_count "
+    "rates_count rates_sum"
+).split()
+RELATION_FIELDS = ["book_id", "user_id", "like", "in_bookmarks", "rate"]
+
+
+def get_reader_counts(
+    books: int, users: int, relations: int, skew: float, rng: random.Random
+) -> list:
+    #  readers per book: weight 1 / rank ** skew over a shuffled ranking;
+    #  what a book cannot take (it has every user) goes to the others
+    weights = [1 / rank**skew for rank in range(1, books + 1)]
+    counts = [0] * books
+    while remaining := relations - sum(counts):
+        open_books = [index for index in range(books) if counts[index] < users]
+        if not open_books:
+            break
+        total = sum(weights[index] for index in open_books)
+        added = 0
+        for index in open_books:
+            extra = min(
+                users - counts[index],
+                int(remaining * weights[index] / total),
+            )
+            counts[index] += extra
+            added += extra
+        if not added:
+            #  the rounding leftovers go to the most popular open books
+            for index in open_books[:remaining]:
+                counts[index] += 1
+    rng.shuffle(counts)
+    return counts
+
+
+def write_rows(
+    model: type, fields: list, rows: Iterable, batch_size: int
+) -> int:
+    from django.db import connection
+
+    from store.importer import copy_rows
+
+    count = 0
+    rows = iter(rows)
+    columns = [model._meta.get_field(field).column for field in fields]
+    while batch := list(islice(rows, batch_size)):
+        if connection.vendor == "postgresql":
+            copy_rows(model._meta.db_table, columns, batch)
+        else:
+            model.objects.bulk_create(
+                [model(**dict(zip(fields, row))) for row in batch]
+            )
+        count += len(batch)
+    return count
+
+
+def generate(
+    books: int,
+    users: int,
+    relations: int,
+    skew: float = 1.0,
+    seed: int = 0,
+    batch_size: int = 10_000,
+) -> dict:
+    from django.contrib.auth.models import User
+    from django.core.management.color import no_style
+    from django.db import connection, transaction
+    from django.db.models import Max
+    from django.utils import timezone
+
+    from store.logic import calculate_rating
+    from store.models import Book, UserBookRelation
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    now = timezone.now()
+    first_user = (User.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+    first_book = (Book.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+    user_ids = range(first_user, first_user + users)
+    counts = get_reader_counts(books, users, relations, skew, rng)
+
+    def user_rows() -> Iterator[tuple]:
+        for user_id in user_ids:
+            #  "!" is an unusable password
+            yield (
+                user_id,
+                f"bench{user_id}",
+                "!",
+                f"First{user_id % 997}",
+                f"Last{user_id % 991}",
+                "",
+                False,
+                False,
+                True,
+                now,
+            )
+
+    def book_rows(offset: int, readers: list) -> Iterator[tuple]:
+        for index, book_readers in enumerate(readers, offset):
+            likes = sum(like for _, like, _, _ in book_readers)
+            bookmarks = sum(bookmark for _, _, bookmark, _ in book_readers)
+            rates = [rate for _, _, _, rate in book_readers if rate]
+            yield (
+                first_book + index,
+                f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {index}",
+                Decimal(rng.randrange(1, 100)),
+                f"Author {rng.randrange(max(books // 20, 1))}",
+                rng.choice(user_ids) if rng.random() < 0.9 else None,
+                calculate_rating(sum(rates), len(rates)),
+                likes,
+                bookmarks,
+                len(rates),
+                sum(rates),
+            )
+
+    def relation_rows(count: int) -> list:
+        #  (user, like, in_bookmarks, rate) of `count` distinct readers
+        return [
+            (
+                user_ids[position],
+                rng.random() < 0.6,
+                rng.random() < 0.2,
+                (
+                    rng.choices(RATES, RATE_WEIGHTS)[0]
+                    if rng.random() < 0.5
+                    else None
+                ),
+            )
+            for position in rng.sample(range(users), count)
+        ]
+
+    with transaction.atomic():
+        write_rows(User, USER_FIELDS, user_rows(), batch_size)
+        written = 0
+        for offset in range(0, books, batch_size):
+            readers = [
+                relation_rows(count)
+                for count in counts[offset : offset + batch_size]
+            ]
+            write_rows(
+                Book, BOOK_FIELDS, book_rows(offset, readers), batch_size
+            )
+            written += write_rows(
+                UserBookRelation,
+                RELATION_FIELDS,
+                (
+                    (first_book + index, *relation)
+                    for index, book_readers in enumerate(readers, offset)
+                    for relation in book_readers
+                ),
+                batch_size,
+            )
+        #  explicit ids leave the sequences behind on PostgreSQL
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Book]
+            ):
+                cursor.execute(sql)
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    return {
+        "books": books,
+        "users": users,
+        "relations": written,
+        "skew": skew,
+        "seed": seed,
+        "generate_s": round(time.perf_counter() - started, 1),
+    }
@@ -0,0 +1,83 @@
+"""
+Requests per second and latency of the sync and async /book/ list under
+many concurrent clients (needs `pip install httpx`). Start the server
+first, e.g.:
+
+    uvicorn books.asgi:application --workers 1
+    python -m benchmarks.load_test --concurrency 100 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+
+async def run_client(
+    client, url: str, deadline: float, latencies: list, errors: list
+) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+        except Exception as exc:  # noqa: BLE001
+            errors.append(type(exc).__name__)
+            continue
+        if response.status_code != 200:
+            errors.append(response.status_code)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def load(url: str, concurrency: int, duration: float) -> dict:
+    import httpx
+
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await client.get(url)
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(
+                run_client(client, url, deadline, latencies, errors)
+                for _ in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "url": url,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--paths",
+        nargs="+",
+        default=["/book/?page_size=20", "/async/book/?page_size=20"],
+    )
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    results = [
+        asyncio.run(
+            load(args.base_url + path, args.concurrency, args.duration)
+        )
+        for path in args.paths
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
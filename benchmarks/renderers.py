@@ -0,0 +1,52 @@
+"""
+JSONRenderer vs ORJSONRenderer on /book/ list payloads.
+
+    python -m benchmarks.renderers --books 1000 10000 --readers 5
+"""
+
+import argparse
+import json
+
+from benchmarks import setup_django, test_database
+from benchmarks.serializer_cache import measure, seed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--readers", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+
+    from store.renderers import ORJSONRenderer
+    from store.serializers import BooksSerializer
+    from store.views import BookViewSet
+
+    results = []
+    with test_database():
+        seed(max(args.books), args.readers)
+        for books in args.books:
+            data = BooksSerializer(
+                BookViewSet.queryset[:books], many=True
+            ).data
+            stdlib = measure(lambda: JSONRenderer().render(data), args.repeat)
+            fast = measure(lambda: ORJSONRenderer().render(data), args.repeat)
+            assert JSONRenderer().render(data) == ORJSONRenderer().render(data)
+            results.append(
+                {
+                    "books": books,
+                    "bytes": len(ORJSONRenderer().render(data)),
+                    "json_cpu_s": round(stdlib, 4),
+                    "orjson_cpu_s": round(fast, 4),
+                    "speedup": round(stdlib / fast, 1),
+                }
+            )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Serializer CPU time of a /book/ page with and without the book row cache.
+
+    python -m benchmarks.serializer_cache --books 1000 --readers 20
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks import setup_django, test_database
+
+
+def seed(books: int, readers: int) -> None:
+    from django.contrib.auth.models import User
+
+    from store.models import Book, UserBookRelation
+
+    users = User.objects.bulk_create(
+        [
+            User(username=f"reader{index}", first_name=f"Name{index}")
+            for index in range(readers)
+        ]
+    )
+    created = Book.objects.bulk_create(
+        [
+            Book(
+                name=f"Book {index}",
+                price=index % 100,
+                author_name=f"Author {index % 50}",
+                owner=users[index % readers],
+            )
+            for index in range(books)
+        ]
+    )
+    UserBookRelation.objects.bulk_create(
+        [
+            UserBookRelation(user=user, book=book, like=True, rate=5)
+            for book in created
+            for user in users
+        ],
+        batch_size=5000,
+    )
+
+
+def measure(render, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        render()
+        timings.append(time.process_time() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+
+    from store.cache import get_book_rows
+    from store.serializers import BooksSerializer
+    from store.views import BookViewSet
+
+    with test_database():
+        seed(args.books, args.readers)
+        books = list(BookViewSet.queryset)
+
+        def serialize(page: list) -> list:
+            return BooksSerializer(page, many=True).data
+
+        def cold() -> None:
+            cache.clear()
+            get_book_rows(books, serialize)
+
+        before = measure(lambda: serialize(books), args.repeat)
+        cold_cache = measure(cold, args.repeat)
+        get_book_rows(books, serialize)
+        warm_cache = measure(
+            lambda: get_book_rows(books, serialize), args.repeat
+        )
+
+    print(
+        json.dumps(
+            {
+                "books": args.books,
+                "readers_per_book": args.readers,
+                "serializer_cpu_s": round(before, 4),
+                "row_cache_cold_cpu_s": round(cold_cache, 4),
+                "row_cache_warm_cpu_s": round(warm_cache, 4),
+                "speedup_warm": round(before / warm_cache, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Per-request time of the dev and prod settings profiles, each measured in
+its own process through the Django test client.
+
+    python -m benchmarks.settings_profiles --requests 300
+
+The prod profile caches in Redis when REDIS_URL is set; without it both
+profiles use the local memory cache.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks import setup_django, test_database
+from benchmarks.serializer_cache import seed
+
+
+def measure_profile(requests: int) -> dict:
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.test import Client, override_settings
+
+    from store.models import Book
+
+    caches = {}
+    if not os.getenv("REDIS_URL"):
+        caches["CACHES"] = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+    with override_settings(**caches), test_database():
+        seed(200, 5)
+        book_id = Book.objects.values_list("id", flat=True).first()
+        client = Client()
+        client.force_login(User.objects.first())
+        paths = {
+            "list": "/book/?page_size=20",
+            "detail": f"/book/{book_id}/",
+            "relation": f"/book_relation/{book_id}/",
+        }
+        timings = {}
+        for name, path in paths.items():
+            method = client.patch if name == "relation" else client.get
+            kwargs = (
+                {"data": {"like": True}, "content_type": "application/json"}
+                if name == "relation"
+                else {}
+            )
+            method(path, **kwargs)
+            started = time.perf_counter()
+            for _ in range(requests):
+                response = method(path, **kwargs)
+                assert response.status_code == 200, response.status_code
+            elapsed = time.perf_counter() - started
+            timings[f"{name}_ms"] = round(elapsed / requests * 1000, 2)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(measure_profile(args.requests)))
+        return
+
+    results = {}
+    for profile in ("dev", "prod"):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.settings_profiles",
+                "--requests",
+                str(args.requests),
+                "--profile",
+                profile,
+            ],
+            env={**os.environ, "DJANGO_ENV": profile},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results[profile] = json.loads(output.splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
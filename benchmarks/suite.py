@@ -0,0 +1,240 @@
+"""
+Throughput, latency percentiles, queries per request and peak RSS of the
+main API routes on a synthetic catalogue (see benchmarks.dataset), printed
+as JSON so runs can be compared between commits. Requests go through the
+whole middleware stack via the Django test client, one at a time.
+
+    python -m benchmarks.suite --books 100000 --users 50000 \\
+        --relations 5000000 --keepdb --output before.json
+    git checkout <other commit>
+    python -m benchmarks.suite --books 100000 --users 50000 \\
+        --relations 5000000 --keepdb --baseline before.json
+
+--keepdb keeps the generated test database, so later runs skip the
+generator; relation_patch writes a few relations into it on every run.
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import time
+from contextlib import ExitStack
+from typing import Callable
+
+from benchmarks import setup_django, test_database
+from benchmarks.dataset import WORDS, generate
+
+PAGE = "page_size=20"
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values: list, percent: float) -> float:
+    #  nearest-rank percentile of sorted `values`
+    index = max(int(round(percent / 100 * len(values))) - 1, 0)
+    return values[index]
+
+
+def peak_rss_mb() -> float:
+    #  ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def get_scenarios(rng: random.Random, book_ids: list, weights: list) -> dict:
+    #  name: (method, request builder returning (path, data)); detail and
+    #  relation requests pick books as often as they are read
+    def hot_book() -> int:
+        return rng.choices(book_ids, weights)[0]
+
+    def relation_data() -> dict:
+        field = rng.choice(("like", "in_bookmarks", "rate"))
+        value = rng.randint(1, 5) if field == "rate" else rng.random() < 0.5
+        return {field: value}
+
+    return {
+        "list": ("get", lambda: (f"/book/?{PAGE}", None)),
+        "list_anonymous": ("get", lambda: (f"/book/?{PAGE}", None)),
+        "list_filter": (
+            "get",
+            lambda: (f"/book/?{PAGE}&price={rng.randrange(1, 100)}", None),
+        ),
+        "list_search": (
+            "get",
+            lambda: (f"/book/?{PAGE}&search={rng.choice(WORDS)}", None),
+        ),
+        "list_ordering_price": (
+            "get",
+            lambda: (f"/book/?{PAGE}&ordering=-price", None),
+        ),
+        "list_ordering_author": (
+            "get",
+            lambda: (f"/book/?{PAGE}&ordering=author_name,price", None),
+        ),
+        "detail": ("get", lambda: (f"/book/{hot_book()}/", None)),
+        "relation_patch": (
+            "patch",
+            lambda: (f"/book_relation/{hot_book()}/", relation_data()),
+        ),
+    }
+
+
+def run_scenario(
+    clients: list, method: str, build: Callable, requests: int, warmup: int
+) -> dict:
+    from django.db import connections
+
+    queries = [0]
+
+    def count(
+        execute: Callable, sql: str, params: tuple, many: bool, context: dict
+    ) -> object:
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    latencies, query_counts, errors = [], [], 0
+    started = time.perf_counter()
+    for number in range(warmup + requests):
+        client = clients[number % len(clients)]
+        path, data = build()
+        kwargs = {"content_type": "application/json"} if data else {}
+        queries[0] = 0
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            request_started = time.perf_counter()
+            response = getattr(client, method)(path, data=data, **kwargs)
+            elapsed = time.perf_counter() - request_started
+        if number < warmup:
+            started = time.perf_counter()
+            continue
+        errors += response.status_code >= 400
+        latencies.append(elapsed)
+        query_counts.append(queries[0])
+    total = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / total, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "queries_avg": round(sum(query_counts) / requests, 2),
+        "queries_max": max(query_counts),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    #  ratios to the baseline run: rps above 1 and latencies below 1 are
+    #  improvements
+    changes = {}
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        changes[name] = {
+            key: round(result[key] / before[key], 2)
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms", "queries_avg")
+            if before.get(key)
+        }
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--relations", type=int, default=200_000)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--clients", type=int, default=20, help="logged-in users"
+    )
+    parser.add_argument("--scenarios", nargs="+")
+    parser.add_argument("--keepdb", action="store_true")
+    parser.add_argument("--baseline", help="JSON output of an earlier run")
+    parser.add_argument("--output", help="also write the JSON to a file")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+
+    from store.models import Book, UserBookRelation
+
+    with test_database(keepdb=args.keepdb):
+        if Book.objects.exists():
+            dataset = {
+                "books": Book.objects.count(),
+                "users": User.objects.count(),
+                "relations": UserBookRelation.objects.count(),
+                "reused": True,
+            }
+        else:
+            dataset = generate(
+                args.books, args.users, args.relations, args.skew, args.seed
+            )
+
+        rng = random.Random(args.seed)
+        rows = list(Book.objects.values_list("id", "likes_count"))
+        book_ids = [book_id for book_id, _ in rows]
+        weights = [likes + 1 for _, likes in rows]
+        scenarios = get_scenarios(rng, book_ids, weights)
+        users = User.objects.order_by("id")[: args.clients]
+        clients = []
+        for user in users:
+            client = Client(raise_request_exception=False)
+            client.force_login(user)
+            clients.append(client)
+
+        results = {
+            "commit": get_commit(),
+            "database": connection.vendor,
+            "dataset": dataset,
+            "scenarios": {},
+        }
+        for name in args.scenarios or scenarios:
+            method, build = scenarios[name]
+            cache.clear()
+            results["scenarios"][name] = run_scenario(
+                [Client()] if name == "list_anonymous" else clients,
+                method,
+                build,
+                args.requests,
+                args.warmup,
+            )
+        results["peak_rss_mb"] = peak_rss_mb()
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            results["vs_baseline"] = compare(results, json.load(file))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Settings profiles of the books project: `DJANGO_ENV=dev` (the default)
+or `DJANGO_ENV=prod` picks books/settings/dev.py or books/settings/prod.py.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+DJANGO_ENV = os.getenv("DJANGO_ENV", "dev")
+
+if DJANGO_ENV == "dev":
+    from books.settings.dev import *  # noqa: F401,F403
+elif DJANGO_ENV == "prod":
+    from books.settings.prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f"DJANGO_ENV must be 'dev' or 'prod', not {DJANGO_ENV!r}"
+    )
@@ -1,5 +1,5 @@
 """
-Django settings for books project.
+Django settings for books project, shared by the dev and prod profiles.
 
 Generated by 'django-admin startproject' using Django 4.2.5.
 
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+
 import os
 from pathlib import Path
 
@@ -17,7 +18,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 
 # Quick-start development settings - unsuitable for production
@@ -27,7 +28,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = False
 
 ALLOWED_HOSTS = []
 
@@ -44,17 +45,15 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "debug_toolbar",
+    "django.contrib.postgres",
     "rest_framework",
     "social_django",
     "store",
 ]
 
 MIDDLEWARE = [
+    "store.middleware.QueryMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
-    # every endpoint needs the ending `?debug-toolbar`
-    "debug_toolbar_force.middleware.ForceDebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -97,6 +96,24 @@ DATABASES = {
         "PORT": "",
     }
 }
+# read-only replica used by store.routers.PrimaryReplicaRouter; while it
+# points at the primary (the default) every query stays on "default"
+DATABASES["replica"] = {
+    **DATABASES["default"],
+    "HOST": os.getenv("DATABASE_REPLICA_HOST", DATABASES["default"]["HOST"]),
+    "PORT": os.getenv("DATABASE_REPLICA_PORT", DATABASES["default"]["PORT"]),
+    "TEST": {"MIRROR": "default"},
+}
+DATABASE_ROUTERS = ["store.routers.PrimaryReplicaRouter"]
+# seconds a user who changed something reads from the primary only
+REPLICA_PIN_SECONDS = 10
+
+# per process, for development and tests only; see books/settings/prod.py
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -141,10 +158,46 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
-    "DEFAULT_PARSER_CLASSES": ("rest_framework.parsers.JSONParser",),
+    # orjson-backed drop-ins for JSONRenderer/JSONParser with the same output
+    "DEFAULT_RENDERER_CLASSES": ("store.renderers.ORJSONRenderer",),
+    "DEFAULT_PARSER_CLASSES": ("store.parsers.ORJSONParser",),
 }
 
+# "inline" updates Book.rating in the request that changes a rate,
+# "deferred" queues the book and recomputes it in batches
+RATING_UPDATES = os.getenv("RATING_UPDATES", "inline")
+RATING_QUEUE_BACKEND = "store.rating_queue.DatabaseRatingQueue"
+RATING_QUEUE_BATCH_SIZE = 500
+# seconds between drains of an in-process worker thread (memory backend)
+RATING_QUEUE_WORKER_INTERVAL = None
+
+# seconds an anonymous /book/ response stays cached; any change to books,
+# relations or users invalidates it earlier
+BOOK_LIST_CACHE_TIMEOUT = 300
+# seconds a serialized book row stays cached, see store.cache.get_book_rows
+BOOK_ROW_CACHE_TIMEOUT = 3600
+
+# how /book/ lists readers unless `?readers=` says otherwise: "full" embeds
+# every reader, "preview" the newest BOOK_READERS_PREVIEW_SIZE and a count
+BOOK_READERS_MODE = os.getenv("BOOK_READERS_MODE", "full")
+BOOK_READERS_PREVIEW_SIZE = 5
+
+# books fetched per server-side cursor round trip by /book/export/
+BOOK_EXPORT_CHUNK_SIZE = 2000
+
+# default backend of `?search=` on /book/: "contains", "fts" or "trigram"
+BOOK_SEARCH_MODE = os.getenv("BOOK_SEARCH_MODE", "contains")
+
+# what happens when a view runs more queries than its `query_budgets`
+# entry allows: "log" a warning, "raise" QueryBudgetExceeded or "" (nothing)
+QUERY_BUDGET_ACTION = os.getenv("QUERY_BUDGET_ACTION", "log")
+
+# rows written per bulk_create/bulk_update by /book_relation/bulk/
+RELATION_BULK_CHUNK_SIZE = 500
+
+# books written per bulk_create/bulk_update by list-form writes to /book/
+BOOK_BULK_CHUNK_SIZE = 500
+
 AUTHENTICATION_BACKENDS = (
     "social_core.backends.github.GithubOAuth2",
     "django.contrib.auth.backends.ModelBackend",
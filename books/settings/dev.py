@@ -0,0 +1,20 @@
+import os
+
+from books.settings.base import *  # noqa: F401,F403
+from books.settings.base import INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = True
+
+INSTALLED_APPS = INSTALLED_APPS + ["debug_toolbar"]
+
+_security = MIDDLEWARE.index("django.middleware.security.SecurityMiddleware")
+MIDDLEWARE = [
+    *MIDDLEWARE[: _security + 1],
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    # every endpoint needs the ending `?debug-toolbar`
+    "debug_toolbar_force.middleware.ForceDebugToolbarMiddleware",
+    *MIDDLEWARE[_security + 1 :],
+]
+
+# over-budget views fail loudly while developing and in the test suite
+QUERY_BUDGET_ACTION = os.getenv("QUERY_BUDGET_ACTION", "raise")
@@ -0,0 +1,53 @@
+import os
+
+from books.settings.base import *  # noqa: F401,F403
+from books.settings.base import DATABASES, TEMPLATES
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host
+]
+
+# every alias keeps its connections open across requests (one per worker
+# thread), checking them before each request
+DATABASES = {
+    alias: {
+        **database,
+        "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+    for alias, database in DATABASES.items()
+}
+
+# the list version, the cached rows and the read-your-writes pins must be
+# shared by every worker process
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+    }
+}
+
+# templates are compiled once per process
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        "APP_DIRS": False,
+        "OPTIONS": {
+            **TEMPLATES[0]["OPTIONS"],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
+        },
+    },
+]
+
+# sessions are read from the cache and written through to the database
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
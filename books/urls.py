@@ -14,23 +14,55 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework.routers import SimpleRouter
 
-from store.views import BookViewSet, auth, UserBookRelationView
+from store.routers import BulkRouter
+from store.views import (
+    AsyncBookView,
+    BookViewSet,
+    LibraryView,
+    auth,
+    metrics,
+    UserBookRelationView,
+)
 
-router = SimpleRouter()
+router = BulkRouter()
 router.register(r"book", BookViewSet)
 router.register(r"book_relation", UserBookRelationView)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("__debug__/", include("debug_toolbar.urls")),
     path(
         "complete/github/", include("social_django.urls", namespace="social")
     ),
     path("auth/", auth),
+    path("metrics/", metrics, name="metrics"),
+    path("async/book/", AsyncBookView.as_view(), name="async-book-list"),
+    path(
+        "async/book/<int:pk>/",
+        AsyncBookView.as_view(),
+        name="async-book-detail",
+    ),
+    path(
+        "me/bookmarks/",
+        LibraryView.as_view({"get": "list"}, shelf="bookmarks"),
+        name="my-bookmarks",
+    ),
+    path(
+        "me/likes/",
+        LibraryView.as_view({"get": "list"}, shelf="likes"),
+        name="my-likes",
+    ),
+    path(
+        "me/rated/",
+        LibraryView.as_view({"get": "list"}, shelf="rated"),
+        name="my-rated",
+    ),
 ]
 
 urlpatterns += router.urls
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
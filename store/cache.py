@@ -0,0 +1,117 @@
+import json
+import time
+from hashlib import md5
+
+from typing import Callable, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import QueryDict
+from rest_framework.utils.encoders import JSONEncoder
+
+from store.routers import reads_from_replica
+
+LIST_VERSION_KEY = "book-list:version"
+LIST_MODIFIED_KEY = "book-list:modified"
+BOOK_ROW_KEY = "book-row:{}:{}"
+#  serializer variants a book row is cached in, see BookViewSet
+BOOK_ROW_VARIANTS = ("full", "preview")
+
+
+def get_list_version() -> tuple:
+    #  (version, last modified timestamp) of everything /book/ renders
+    values = cache.get_many([LIST_VERSION_KEY, LIST_MODIFIED_KEY])
+    if LIST_VERSION_KEY in values and LIST_MODIFIED_KEY in values:
+        return values[LIST_VERSION_KEY], values[LIST_MODIFIED_KEY]
+    return bump_list_version()
+
+
+def bump_list_version() -> tuple:
+    modified = int(time.time())
+    try:
+        version = cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        #  a fresh counter must not reuse versions of entries still cached
+        version = time.time_ns()
+        cache.set(LIST_VERSION_KEY, version, timeout=None)
+    cache.set(LIST_MODIFIED_KEY, modified, timeout=None)
+    return version, modified
+
+
+def replica_caught_up() -> bool:
+    #  whether reads of the current request may be cached: the replica
+    #  serves them long enough (REPLICA_PIN_SECONDS) after the last
+    #  invalidation to have replayed the write behind it; a lagging one
+    #  would otherwise cache data older than that invalidation
+    if not reads_from_replica():
+        return True
+    modified = cache.get(LIST_MODIFIED_KEY)
+    lag = getattr(settings, "REPLICA_PIN_SECONDS", 10)
+    #  the timestamp is truncated to whole seconds
+    return modified is not None and time.time() - modified >= lag + 1
+
+
+def get_list_cache_key(version: int, host: str, params: QueryDict) -> str:
+    normalized = sorted(
+        (key, sorted(values)) for key, values in params.lists() if values
+    )
+    digest = md5(repr((host, normalized)).encode()).hexdigest()
+    return f"book-list:{version}:{digest}"
+
+
+def invalidate_book_list() -> None:
+    bump_list_version()
+    #  responses cached by readers that could not see the uncommitted
+    #  change yet are dropped by a second bump after the commit
+    transaction.on_commit(bump_list_version)
+
+
+def get_book_rows(
+    books: list, render: Callable, variant: str = "full"
+) -> list:
+    #  serialized books from the cache; only misses are passed to `render`.
+    #  rows are kept as JSON text, which loads much faster than unpickling
+    #  the serializer's OrderedDicts
+    keys = {book.id: BOOK_ROW_KEY.format(variant, book.id) for book in books}
+    cached = cache.get_many(keys.values())
+    rows = {key: json.loads(fragment) for key, fragment in cached.items()}
+    missing = [book for book in books if keys[book.id] not in rows]
+    if missing:
+        fresh = {
+            keys[book.id]: row for book, row in zip(missing, render(missing))
+        }
+        if replica_caught_up():
+            cache.set_many(
+                {
+                    key: json.dumps(
+                        row, cls=JSONEncoder, separators=(",", ":")
+                    )
+                    for key, row in fresh.items()
+                },
+                getattr(settings, "BOOK_ROW_CACHE_TIMEOUT", 3600),
+            )
+        rows.update(fresh)
+    return [rows[keys[book.id]] for book in books]
+
+
+def delete_book_rows(book_ids: Sequence, batch_size: int = 1000) -> None:
+    #  keys are built batch by batch, so huge imports stay cheap to hold
+    for start in range(0, len(book_ids), batch_size):
+        cache.delete_many(
+            [
+                BOOK_ROW_KEY.format(variant, book_id)
+                for variant in BOOK_ROW_VARIANTS
+                for book_id in book_ids[start : start + batch_size]
+            ]
+        )
+
+
+def invalidate_book_rows(book_ids: Sequence) -> None:
+    delete_book_rows(book_ids)
+    transaction.on_commit(lambda: delete_book_rows(book_ids))
+
+
+def invalidate_books(book_ids: list) -> None:
+    invalidate_book_rows(book_ids)
+    invalidate_book_list()
@@ -0,0 +1,118 @@
+import operator
+from functools import lru_cache, reduce
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import Expression, FloatField, Q, QuerySet
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Greatest
+from django.views import View
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+
+
+@lru_cache
+def trigram_installed(alias: str) -> bool:
+    #  migration 0014 skips pg_trgm where it cannot be installed
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class BookSearchFilter(SearchFilter):
+    # `?search_mode=fts|trigram|contains` picks the backend of `?search=`;
+    # fts and trigram need PostgreSQL (see migration 0014), trigram also the
+    # pg_trgm extension; otherwise the plain `icontains` search is used
+    search_mode_param = "search_mode"
+    search_modes = ("contains", "fts", "trigram")
+    search_config = "simple"
+
+    def get_search_mode(self, request: Request) -> str:
+        mode = request.query_params.get(self.search_mode_param) or getattr(
+            settings, "BOOK_SEARCH_MODE", "contains"
+        )
+        if mode not in self.search_modes:
+            raise ValidationError(
+                {
+                    self.search_mode_param: [
+                        f"Expected one of: {', '.join(self.search_modes)}."
+                    ]
+                }
+            )
+        return mode
+
+    def filter_queryset(
+        self, request: Request, queryset: QuerySet, view: View
+    ) -> QuerySet:
+        mode = self.get_search_mode(request)
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        vendor = connections[queryset.db].vendor
+
+        if (
+            mode == "contains"
+            or vendor != "postgresql"
+            or not search_fields
+            or not search_terms
+        ):
+            return super().filter_queryset(request, queryset, view)
+        if mode == "fts":
+            return self.filter_fts(queryset, search_terms)
+        if not trigram_installed(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+        return self.filter_trigram(queryset, search_fields, search_terms)
+
+    def filter_fts(self, queryset: QuerySet, search_terms: list) -> QuerySet:
+        #  `search_vector` is a generated column, unknown to the model
+        table = queryset.model._meta.db_table
+        vector = RawSQL(
+            f'"{table}"."search_vector"', [], output_field=SearchVectorField()
+        )
+        query = SearchQuery(" ".join(search_terms), config=self.search_config)
+        return self.rank(
+            queryset.alias(search_vector=vector).filter(search_vector=query),
+            SearchRank(vector, query),
+        )
+
+    def filter_trigram(
+        self, queryset: QuerySet, search_fields: list, search_terms: list
+    ) -> QuerySet:
+        #  `term <% field` is served by the gin_trgm_ops indexes
+        conditions = [
+            reduce(
+                operator.or_,
+                (
+                    Q(**{f"{field}__trigram_word_similar": term})
+                    for field in search_fields
+                ),
+            )
+            for term in search_terms
+        ]
+        similarities = [
+            TrigramWordSimilarity(term, field)
+            for term in search_terms
+            for field in search_fields
+        ]
+        similarity = (
+            Greatest(*similarities)
+            if len(similarities) > 1
+            else similarities[0]
+        )
+        return self.rank(
+            queryset.filter(reduce(operator.and_, conditions)), similarity
+        )
+
+    @staticmethod
+    def rank(queryset: QuerySet, rank: Expression) -> QuerySet:
+        #  selected, so that KeysetPagination can page by it; ranks are
+        #  `real`, cast to read back exactly the values compared in cursors
+        return queryset.annotate(
+            search_rank=Cast(rank, FloatField())
+        ).order_by("-search_rank", "id")
@@ -0,0 +1,269 @@
+import csv
+import io
+import json
+from array import array
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, Iterator, TextIO
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from store.cache import invalidate_book_list, invalidate_book_rows
+from store.models import Book
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+#  fields that may make up the natural key of an upsert
+KEY_FIELDS = ("name", "author_name")
+#  every error is counted, only the first ones are kept for the report
+MAX_REPORTED_ERRORS = 20
+COPY_ESCAPES = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+)
+
+
+def copy_value(value: object) -> str:
+    #  a value in the text format of COPY
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_rows(table: str, columns: Iterable, rows: Iterable) -> None:
+    #  rows are tuples in the order of `columns`, sent in one COPY
+    buffer = io.StringIO(
+        "".join("\t".join(map(copy_value, row)) + "\n" for row in rows)
+    )
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote(table)} ({', '.join(map(quote, columns))}) "
+            "FROM STDIN",
+            buffer,
+        )
+
+
+def read_rows(file: TextIO, format: str) -> Iterator[dict | None]:
+    #  rows of a CSV file with a header line or of a JSON lines file;
+    #  None stands for a line that is not valid JSON
+    if format == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield orjson.loads(line) if orjson else json.loads(line)
+        except ValueError:
+            yield None
+
+
+class BookImporter:
+    # streams rows into Book in chunks of `chunk_size`, so memory does not
+    # grow with the file. Without `key` every valid row is inserted; with
+    # it, books matching a row on the key fields are updated instead and
+    # the last row wins. PostgreSQL loads each chunk with COPY into a
+    # temporary staging table and merges it with two statements
+    staging_table = "book_import"
+    columns = ("name", "price", "author_name", "owner_id")
+
+    def __init__(
+        self,
+        key: tuple = (),
+        chunk_size: int = 10_000,
+        progress: Callable = None,
+    ) -> None:
+        if not set(key) <= set(KEY_FIELDS):
+            raise ValueError(f"Key fields must be among {KEY_FIELDS}.")
+        self.key = tuple(key)
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.owners = {}
+        self.stats = {"read": 0, "created": 0, "updated": 0, "skipped": 0}
+        self.errors = []
+        #  ids of updated books, whose cached rows are dropped at the end
+        self.updated = array("q")
+
+    @property
+    def use_copy(self) -> bool:
+        return connection.vendor == "postgresql"
+
+    def run(self, rows: Iterable) -> dict:
+        rows = enumerate(rows, 1)
+        with transaction.atomic():
+            if self.use_copy:
+                self.create_staging_table()
+            while chunk := list(islice(rows, self.chunk_size)):
+                books = self.clean(chunk)
+                if self.use_copy:
+                    self.merge_staged(books)
+                else:
+                    self.save(books)
+                if self.progress:
+                    self.progress(self.stats)
+            #  bulk writes send no post_save
+            invalidate_book_rows(self.updated)
+            invalidate_book_list()
+        return self.stats
+
+    def skip(self, number: int, errors: dict) -> None:
+        self.stats["skipped"] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, errors))
+
+    def clean(self, chunk: list) -> list:
+        #  [(row number, {field: value, "owner_id": id}), ...] of the
+        #  valid rows; owners of the whole chunk are looked up at once
+        cleaned = []
+        for number, row in chunk:
+            self.stats["read"] += 1
+            if not isinstance(row, dict):
+                self.skip(number, {"row": ["Expected a JSON object."]})
+                continue
+            values, errors = {}, {}
+            for name in ("name", "price", "author_name"):
+                try:
+                    values[name] = Book._meta.get_field(name).clean(
+                        row.get(name), None
+                    )
+                except ValidationError as exc:
+                    errors[name] = exc.messages
+            values["owner"] = row.get("owner") or None
+            if errors:
+                self.skip(number, errors)
+            else:
+                cleaned.append((number, values))
+
+        usernames = {
+            values["owner"] for _, values in cleaned if values["owner"]
+        } - set(self.owners)
+        if usernames:
+            self.owners.update(
+                User.objects.filter(username__in=usernames).values_list(
+                    "username", "id"
+                )
+            )
+        books = []
+        for number, values in cleaned:
+            username = values.pop("owner")
+            if username and username not in self.owners:
+                self.skip(number, {"owner": [f"Unknown user {username!r}."]})
+                continue
+            values["owner_id"] = self.owners.get(username)
+            books.append((number, values))
+        return books
+
+    def create_staging_table(self) -> None:
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            f"{quote(field.column)} {field.db_type(connection)}"
+            for field in map(Book._meta.get_field, self.columns)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE IF NOT EXISTS "
+                f"{quote(self.staging_table)} "
+                f"(line bigint, {columns}) ON COMMIT DROP"
+            )
+
+    def merge_staged(self, books: list) -> None:
+        quote = connection.ops.quote_name
+        staging, table = quote(self.staging_table), quote(Book._meta.db_table)
+        columns = [quote(Book._meta.get_field(f).column) for f in self.columns]
+        copy_rows(
+            self.staging_table,
+            ["line", *self.columns],
+            (
+                (number, *(values[field] for field in self.columns))
+                for number, values in books
+            ),
+        )
+        source = f"SELECT * FROM {staging} ORDER BY line"
+        with connection.cursor() as cursor:
+            if self.key:
+                key = [quote(Book._meta.get_field(f).column) for f in self.key]
+                #  repeated keys keep their last row
+                source = (
+                    f"SELECT DISTINCT ON ({', '.join(key)}) * FROM {staging} "
+                    f"ORDER BY {', '.join(key)}, line DESC"
+                )
+                matches = " AND ".join(
+                    f"book.{column} = staged.{column}" for column in key
+                )
+                assignments = ", ".join(
+                    f"{column} = staged.{column}"
+                    for column in columns
+                    if column not in key
+                )
+                cursor.execute(
+                    f"UPDATE {table} AS book SET {assignments} "
+                    f"FROM ({source}) AS staged WHERE {matches} "
+                    "RETURNING book.id"
+                )
+                updated = cursor.fetchall()
+                self.stats["updated"] += len(updated)
+                self.updated.extend(book_id for book_id, in updated)
+                source = (
+                    f"SELECT * FROM ({source}) AS staged WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM {table} AS book WHERE {matches})"
+                )
+            #  counters are not database defaults, so they are set here
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}, rating, "
+                "likes_count, bookmarks_count, rates_count, rates_sum) "
+                f"SELECT {', '.join(columns)}, NULL, 0, 0, 0, 0 "
+                f"FROM ({source}) AS staged"
+            )
+            self.stats["created"] += cursor.rowcount
+            cursor.execute(f"TRUNCATE {staging}")
+
+    def save(self, books: list) -> None:
+        if not self.key:
+            Book.objects.bulk_create(
+                [Book(**values) for _, values in books],
+                batch_size=self.chunk_size,
+            )
+            self.stats["created"] += len(books)
+            return
+
+        #  repeated keys keep their last row
+        latest = {
+            tuple(values[field] for field in self.key): values
+            for _, values in books
+        }
+        lookups = {
+            f"{field}__in": {key[index] for key in latest}
+            for index, field in enumerate(self.key)
+        }
+        fields = [field for field in self.columns if field not in self.key]
+        existing = []
+        for book in Book.objects.filter(**lookups):
+            values = latest.get(tuple(getattr(book, f) for f in self.key))
+            if values is not None:
+                for field in fields:
+                    setattr(book, field, values[field])
+                existing.append(book)
+        found = {
+            tuple(getattr(book, f) for f in self.key) for book in existing
+        }
+        Book.objects.bulk_update(existing, fields, batch_size=self.chunk_size)
+        Book.objects.bulk_create(
+            [
+                Book(**values)
+                for key, values in latest.items()
+                if key not in found
+            ],
+            batch_size=self.chunk_size,
+        )
+        self.stats["updated"] += len(existing)
+        self.updated.extend(book.id for book in existing)
+        self.stats["created"] += len(latest) - len(found)
@@ -1,13 +1,312 @@
-from django.db.models import Avg
+from decimal import ROUND_HALF_UP, Decimal
 
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DecimalField,
+    Exists,
+    Expression,
+    F,
+    FilteredRelation,
+    FloatField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Sum,
+    Window,
+)
+from django.db.models.functions import (
+    Cast,
+    Coalesce,
+    NullIf,
+    Round,
+    RowNumber,
+)
+
+from store.cache import invalidate_book_list, invalidate_books
 from store.models import Book, UserBookRelation
 
+COUNTERS = ("likes_count", "bookmarks_count", "rates_count", "rates_sum")
+
+
+def rating_expression(
+    rates_sum: Expression, rates_count: Expression
+) -> Expression:
+    #  NULL when nobody rated the book, like Avg() over no rows
+    average = Cast(rates_sum, FloatField()) / NullIf(rates_count, 0)
+    return Cast(
+        Round(average, 2), DecimalField(max_digits=3, decimal_places=2)
+    )
+
+
+def calculate_rating(rates_sum: int, rates_count: int) -> Decimal | None:
+    if not rates_count:
+        return None
+    return (Decimal(rates_sum) / rates_count).quantize(
+        Decimal("0.01"), rounding=ROUND_HALF_UP
+    )
+
 
 def set_rating(book: Book) -> None:
-    rating = (
-        UserBookRelation.objects.filter(book=book)
-        .aggregate(rating=Avg("rate"))
-        .get("rating")
+    Book.objects.filter(pk=book.pk).update(
+        rating=rating_expression(F("rates_sum"), F("rates_count"))
     )
-    book.rating = rating
-    book.save()
+
+
+def get_counter_deltas(old: dict | None, new: dict | None) -> dict:
+    old, new = old or {}, new or {}
+    old_rate, new_rate = old.get("rate"), new.get("rate")
+    return {
+        "likes_count": bool(new.get("like")) - bool(old.get("like")),
+        "bookmarks_count": (
+            bool(new.get("in_bookmarks")) - bool(old.get("in_bookmarks"))
+        ),
+        "rates_count": (new_rate is not None) - (old_rate is not None),
+        "rates_sum": (new_rate or 0) - (old_rate or 0),
+    }
+
+
+def update_counters(
+    book_id: int, old: dict | None, new: dict | None, using: str = None
+) -> None:
+    from store import rating_queue
+
+    deltas = get_counter_deltas(old, new)
+    rate_changed = bool(deltas["rates_count"] or deltas["rates_sum"])
+    if rate_changed and (
+        rating_queue.is_batched() or rating_queue.is_deferred()
+    ):
+        #  rates_count, rates_sum and rating are recounted later
+        del deltas["rates_count"], deltas["rates_sum"]
+        rating_queue.enqueue([book_id])
+        rate_changed = False
+
+    changes = {
+        counter: F(counter) + delta
+        for counter, delta in deltas.items()
+        if delta
+    }
+    #  the right-hand side sees the row before the update, so the rating
+    #  is computed from the new sum and count in the same statement
+    if rate_changed:
+        changes["rating"] = rating_expression(
+            F("rates_sum") + deltas["rates_sum"],
+            F("rates_count") + deltas["rates_count"],
+        )
+    if changes:
+        Book.objects.db_manager(using).filter(pk=book_id).update(**changes)
+
+
+def lock_books(book_ids: list) -> None:
+    #  taken before counting relations of the books, so counter updates of
+    #  concurrent writes wait for the recount instead of being overwritten;
+    #  in id order to keep concurrent lockers from deadlocking
+    list(
+        Book.objects.select_for_update()
+        .filter(id__in=book_ids)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def count_relations(book_ids: list = None) -> dict:
+    relations = UserBookRelation.objects.all()
+    if book_ids is not None:
+        relations = relations.filter(book_id__in=book_ids)
+    rows = (
+        relations.values("book_id")
+        .annotate(
+            likes_count=Count("id", filter=Q(like=True)),
+            bookmarks_count=Count("id", filter=Q(in_bookmarks=True)),
+            rates_count=Count("rate"),
+            rates_sum=Coalesce(Sum("rate"), 0),
+        )
+        .order_by()
+    )
+    return {row.pop("book_id"): row for row in rows}
+
+
+def annotate_user_state(queryset: QuerySet, user: User) -> QuerySet:
+    #  is_liked, in_bookmarks and my_rate of `user` through one LEFT JOIN
+    #  on the (user, book) unique index
+    return queryset.annotate(
+        my_relation=FilteredRelation(
+            "relation", condition=Q(relation__user=user)
+        ),
+        is_liked=Coalesce("my_relation__like", False),
+        in_bookmarks=Coalesce("my_relation__in_bookmarks", False),
+        my_rate=F("my_relation__rate"),
+    )
+
+
+def get_readers_preview(book_ids: list, size: int) -> dict:
+    #  {book_id: (readers_count, [reader, ...])} for a whole page in one
+    #  query; the newest `size` relations of every book come first
+    rows = (
+        UserBookRelation.objects.filter(book_id__in=book_ids)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("book_id"),
+                order_by=F("id").desc(),
+            ),
+            readers_count=Window(Count("id"), partition_by=F("book_id")),
+        )
+        .filter(position__lte=size)
+        .order_by("book_id", "position")
+        .values_list(
+            "book_id", "readers_count", "user__first_name", "user__last_name"
+        )
+    )
+    previews = {}
+    for book_id, readers_count, first_name, last_name in rows:
+        _, readers = previews.setdefault(book_id, (readers_count, []))
+        readers.append({"first_name": first_name, "last_name": last_name})
+    return previews
+
+
+def recompute_ratings(book_ids: list) -> None:
+    #  one grouped aggregate and one bulk UPDATE for the whole batch
+    with transaction.atomic():
+        lock_books(book_ids)
+        counts = count_relations(book_ids)
+        books = []
+        for book_id in book_ids:
+            rates = counts.get(book_id, {})
+            rates_count = rates.get("rates_count", 0)
+            rates_sum = rates.get("rates_sum", 0)
+            books.append(
+                Book(
+                    id=book_id,
+                    rates_count=rates_count,
+                    rates_sum=rates_sum,
+                    rating=calculate_rating(rates_sum, rates_count),
+                )
+            )
+        Book.objects.bulk_update(books, ["rates_count", "rates_sum", "rating"])
+        invalidate_books(book_ids)
+
+
+def rebuild_counters(
+    book_ids: list = None, commit: bool = True, batch_size: int = 500
+) -> list:
+    #  returns [(book_id, {field: (stored, actual)}), ...] for drifted books
+    counts = count_relations(book_ids)
+    fields = COUNTERS + ("rating",)
+    books = Book.objects.only(*fields).order_by("id")
+    if book_ids is not None:
+        books = books.filter(id__in=book_ids)
+
+    drift, changed = [], []
+    for book in books.iterator(chunk_size=batch_size):
+        actual = dict.fromkeys(COUNTERS, 0)
+        actual.update(counts.get(book.id, {}))
+        actual["rating"] = calculate_rating(
+            actual["rates_sum"], actual["rates_count"]
+        )
+        diff = {}
+        for field in fields:
+            if getattr(book, field) != actual[field]:
+                diff[field] = (getattr(book, field), actual[field])
+                setattr(book, field, actual[field])
+        if diff:
+            drift.append((book.id, diff))
+            changed.append(book)
+
+    if commit and changed:
+        Book.objects.bulk_update(changed, fields, batch_size=batch_size)
+        invalidate_books([book.id for book in changed])
+    return drift
+
+
+def bulk_set_relations(user: User, items: list, chunk_size: int = 500) -> list:
+    #  items are {"book": id, "like": ..., "in_bookmarks": ..., "rate": ...};
+    #  keys left out keep their stored value (or the default for new rows)
+    statuses = [None] * len(items)
+    touched = set()
+    with transaction.atomic():
+        for start in range(0, len(items), chunk_size):
+            chunk = list(enumerate(items[start : start + chunk_size], start))
+            existing = dict(
+                Book.objects.filter(id__in={item["book"] for _, item in chunk})
+                .annotate(
+                    related=Exists(
+                        UserBookRelation.objects.filter(
+                            user=user, book=OuterRef("pk")
+                        )
+                    )
+                )
+                .values_list("id", "related")
+            )
+
+            #  a row may be upserted only once per statement, so repeated
+            #  books are merged with the later values winning
+            values = {}
+            for index, item in chunk:
+                book_id = item["book"]
+                if book_id not in existing:
+                    statuses[index] = {"book": book_id, "status": "not_found"}
+                    continue
+                values.setdefault(book_id, {}).update(
+                    (field, item[field])
+                    for field in UserBookRelation.COUNTED_FIELDS
+                    if field in item
+                )
+                statuses[index] = {
+                    "book": book_id,
+                    "status": "updated" if existing[book_id] else "created",
+                }
+
+            groups = {}
+            for book_id, fields in values.items():
+                groups.setdefault(tuple(sorted(fields)), []).append(
+                    UserBookRelation(user=user, book_id=book_id, **fields)
+                )
+            for fields, relations in groups.items():
+                if fields:
+                    UserBookRelation.objects.bulk_create(
+                        relations,
+                        update_conflicts=True,
+                        unique_fields=["user", "book"],
+                        update_fields=fields,
+                    )
+                else:
+                    UserBookRelation.objects.bulk_create(
+                        relations, ignore_conflicts=True
+                    )
+            touched.update(values)
+
+        #  bulk writes skip save(), so recount the affected books at once
+        if touched:
+            lock_books(list(touched))
+            rebuild_counters(list(touched))
+            #  new readers change the rows even when counters do not
+            invalidate_books(list(touched))
+    return statuses
+
+
+def bulk_create_books(owner: User, items: list, chunk_size: int = 500) -> list:
+    #  items are validated BooksSerializer data; ids are set on the
+    #  returned books by backends that support RETURNING
+    books = [Book(owner=owner, **item) for item in items]
+    with transaction.atomic():
+        Book.objects.bulk_create(books, batch_size=chunk_size)
+        #  bulk_create sends no post_save, so lists are invalidated here
+        invalidate_book_list()
+    return books
+
+
+def bulk_update_books(changes: list, chunk_size: int = 500) -> None:
+    #  changes are [(book, {field: value}), ...]; each book is updated
+    #  only in the fields given for it
+    groups = {}
+    for book, values in changes:
+        for field, value in values.items():
+            setattr(book, field, value)
+        groups.setdefault(tuple(sorted(values)), []).append(book)
+    with transaction.atomic():
+        for fields, books in groups.items():
+            if fields:
+                Book.objects.bulk_update(books, fields, batch_size=chunk_size)
+        invalidate_books([book.id for book, _ in changes])
@@ -0,0 +1,82 @@
+import sys
+import time
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+
+from store.importer import KEY_FIELDS, BookImporter, read_rows
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books from a CSV (with a header line) or JSON lines file "
+        "with name, price, author_name and owner (a username) columns."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", help='File to import, "-" for stdin.')
+        parser.add_argument(
+            "--format",
+            choices=sorted(set(FORMATS.values())),
+            help="Defaults to the one of the file extension.",
+        )
+        parser.add_argument(
+            "--key",
+            nargs="+",
+            choices=KEY_FIELDS,
+            default=(),
+            help="Update books matching a row on these fields.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10_000)
+
+    def handle(self, *args, **options) -> None:
+        path = options["path"]
+        format = options["format"] or next(
+            (f for ext, f in FORMATS.items() if path.endswith(ext)), None
+        )
+        if format is None:
+            raise CommandError("Pass --format for this file.")
+
+        started = time.perf_counter()
+
+        def progress(stats: dict) -> None:
+            self.stdout.write(
+                "{read} read, {created} created, {updated} updated, "
+                "{skipped} skipped".format(**stats)
+                + f" ({time.perf_counter() - started:.1f}s)"
+            )
+
+        importer = BookImporter(
+            key=options["key"],
+            chunk_size=options["chunk_size"],
+            progress=progress,
+        )
+        if path == "-":
+            stats = importer.run(read_rows(sys.stdin, format))
+        else:
+            with open(path, newline="", encoding="utf-8") as file:
+                stats = importer.run(read_rows(file, format))
+
+        for number, errors in importer.errors:
+            messages = "; ".join(
+                f"{field}: {' '.join(field_errors)}"
+                for field, field_errors in errors.items()
+            )
+            self.stderr.write(f"Row {number}: {messages}")
+        if stats["skipped"] > len(importer.errors):
+            self.stderr.write(
+                f"... and {stats['skipped'] - len(importer.errors)} more."
+            )
+        style = self.style.WARNING if stats["skipped"] else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f"Imported {stats['created'] + stats['updated']} book(s) "
+                f"from {stats['read']} row(s) in "
+                f"{time.perf_counter() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from store.rating_queue import flush, run_worker
+
+
+class Command(BaseCommand):
+    help = "Recompute ratings of books queued by deferred rating updates."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue once and exit.",
+        )
+        parser.add_argument("--interval", type=float, default=1.0)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options) -> None:
+        if options["once"]:
+            processed = flush(options["batch_size"])
+            self.stdout.write(f"Recomputed {processed} book rating(s).")
+            return
+        run_worker(options["interval"], options["batch_size"])
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from store.logic import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recount like/bookmark/rate counters of books from relations."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drift, do not fix the stored counters.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options) -> None:
+        drift = rebuild_counters(
+            commit=not options["dry_run"], batch_size=options["batch_size"]
+        )
+        for book_id, diff in drift:
+            changes = ", ".join(
+                f"{counter} {stored} -> {actual}"
+                for counter, (stored, actual) in diff.items()
+            )
+            self.stdout.write(f"Book {book_id}: {changes}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("No drift found."))
+        elif options["dry_run"]:
+            self.stdout.write(
+                self.style.WARNING(f"{len(drift)} book(s) drifted.")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"{len(drift)} book(s) fixed.")
+            )
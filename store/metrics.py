@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+#  histograms recorded for every resolved route
+METRICS = {
+    "db_queries": ("DB queries per request", QUERY_BUCKETS),
+    "db_seconds": ("time spent in DB queries", SECONDS_BUCKETS),
+    "serializer_seconds": (
+        "time spent building serializer data",
+        SECONDS_BUCKETS,
+    ),
+    "request_seconds": ("total request time", SECONDS_BUCKETS),
+}
+
+#  measurements of the request being handled, see RequestMetrics
+current = ContextVar("request_metrics", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class Histogram:
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        #  the last slot counts observations above every bucket (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Registry:
+    # in-process histograms keyed by (metric, route); every worker process
+    # keeps and exposes its own
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, route: str, values: dict) -> None:
+        with self.lock:
+            for metric, value in values.items():
+                key = (metric, route)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(METRICS[metric][1])
+                self.histograms[key].observe(value)
+
+    def get(self, metric: str, route: str) -> Histogram | None:
+        return self.histograms.get((metric, route))
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
+
+    def render(self) -> str:
+        #  Prometheus text exposition format
+        lines = []
+        with self.lock:
+            for metric, (help_text, _) in METRICS.items():
+                name = f"store_{metric}"
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (key, route), histogram in sorted(self.histograms.items()):
+                    if key != metric:
+                        continue
+                    cumulative = 0
+                    bounds = [*map(str, histogram.buckets), "+Inf"]
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{{route="{route}",le="{bound}"}} '
+                            f"{cumulative}"
+                        )
+                    lines.append(
+                        f'{name}_sum{{route="{route}"}} {histogram.sum}'
+                    )
+                    lines.append(
+                        f'{name}_count{{route="{route}"}} {histogram.count}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+    def execute_wrapper(
+        self,
+        execute: Callable,
+        sql: str,
+        params: Any,
+        many: bool,
+        context: dict,
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+
+def record_query(
+    execute: Callable, sql: str, params: Any, many: bool, context: dict
+) -> Any:
+    #  execute wrapper of every connection (see store.signals): queries are
+    #  counted for the request being measured, in whichever thread they run
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute_wrapper(execute, sql, params, many, context)
+
+
+@contextmanager
+def serializer_timer() -> Iterator[None]:
+    #  nested serializers are only counted once, by the outermost one
+    metrics = current.get()
+    if metrics is None or metrics.serializer_depth:
+        yield
+        return
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_seconds += time.perf_counter() - started
+        metrics.serializer_depth -= 1
+
+
+def check_budget(
+    route: str, budget: int | None, queries: int, action: str | None
+) -> None:
+    #  action is "log", "raise" or None (budgets are ignored)
+    if budget is None or queries <= budget or not action:
+        return
+    message = f"{route} ran {queries} queries, its budget is {budget}"
+    if action == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
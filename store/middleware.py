@@ -0,0 +1,97 @@
+import time
+from typing import Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+from store.metrics import RequestMetrics, check_budget, current, registry
+
+
+def get_query_budget(view_func: Callable, method: str) -> int | None:
+    #  `query_budgets` on a view class maps viewset actions (or lowercase
+    #  HTTP methods of plain views) to the most queries they may run
+    view_class = getattr(view_func, "cls", None) or getattr(
+        view_func, "view_class", None
+    )
+    budgets = getattr(view_class, "query_budgets", None) or {}
+    actions = getattr(view_func, "actions", None) or {}
+    return budgets.get(actions.get(method.lower(), method.lower()))
+
+
+class QueryMetricsMiddleware:
+    # records query count, DB time, serializer time and total time of every
+    # resolved route in store.metrics.registry and enforces query budgets.
+    # Queries are counted by store.metrics.record_query, which follows the
+    # request into the threads async views run the ORM in
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        self.observe(request, response, metrics, started)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        self.observe(request, response, metrics, started)
+        return response
+
+    def observe(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        metrics: RequestMetrics,
+        started: float,
+    ) -> None:
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        if match is None or match.view_name == "metrics":
+            return
+        registry.observe(
+            match.view_name,
+            {
+                "db_queries": metrics.queries,
+                "db_seconds": metrics.db_seconds,
+                "serializer_seconds": metrics.serializer_seconds,
+                "request_seconds": elapsed,
+            },
+        )
+        #  failed requests keep their own response; the queries an error
+        #  path runs say nothing about the route's budget
+        if not 200 <= response.status_code < 300:
+            return
+        check_budget(
+            match.view_name,
+            getattr(request, "query_budget", None),
+            metrics.queries,
+            getattr(settings, "QUERY_BUDGET_ACTION", "log"),
+        )
+
+    def process_view(
+        self,
+        request: HttpRequest,
+        view_func: Callable,
+        view_args: tuple,
+        view_kwargs: dict,
+    ) -> None:
+        request.query_budget = get_query_budget(view_func, request.method)
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.5 on 2023-10-05 11:12
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+COUNTERS = ("likes_count", "bookmarks_count", "rates_count", "rates_sum")
+
+
+def fill_counters(apps, schema_editor) -> None:
+    Book = apps.get_model("store", "Book")
+    UserBookRelation = apps.get_model("store", "UserBookRelation")
+
+    rows = (
+        UserBookRelation.objects.values("book_id")
+        .annotate(
+            likes_count=Count("id", filter=Q(like=True)),
+            bookmarks_count=Count("id", filter=Q(in_bookmarks=True)),
+            rates_count=Count("rate"),
+            rates_sum=Coalesce(Sum("rate"), 0),
+        )
+        .order_by()
+    )
+    books = []
+    for row in rows:
+        book = Book(id=row.pop("book_id"), **row)
+        books.append(book)
+    Book.objects.bulk_update(books, COUNTERS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0009_book_rating"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="bookmarks_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rates_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="rates_sum",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
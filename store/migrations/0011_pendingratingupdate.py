@@ -0,0 +1,35 @@
+# Generated by Django 4.2.5 on 2026-10-18 02:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0010_book_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingRatingUpdate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "book",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="store.book",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:41
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+COUNTERS = ("likes_count", "bookmarks_count", "rates_count", "rates_sum")
+
+
+def merge_duplicates(apps, schema_editor) -> None:
+    Book = apps.get_model("store", "Book")
+    UserBookRelation = apps.get_model("store", "UserBookRelation")
+
+    duplicates = (
+        UserBookRelation.objects.values("user_id", "book_id")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    book_ids = set()
+    for pair in duplicates:
+        relations = list(
+            UserBookRelation.objects.filter(
+                user_id=pair["user_id"], book_id=pair["book_id"]
+            ).order_by("id")
+        )
+        kept = relations[0]
+        kept.like = any(relation.like for relation in relations)
+        kept.in_bookmarks = any(
+            relation.in_bookmarks for relation in relations
+        )
+        #  the latest rate wins
+        rates = [rel.rate for rel in relations if rel.rate is not None]
+        kept.rate = rates[-1] if rates else None
+        kept.save(update_fields=["like", "in_bookmarks", "rate"])
+        UserBookRelation.objects.filter(
+            id__in=[relation.id for relation in relations[1:]]
+        ).delete()
+        book_ids.add(pair["book_id"])
+
+    rows = (
+        UserBookRelation.objects.filter(book_id__in=book_ids)
+        .values("book_id")
+        .annotate(
+            likes_count=Count("id", filter=Q(like=True)),
+            bookmarks_count=Count("id", filter=Q(in_bookmarks=True)),
+            rates_count=Count("rate"),
+            rates_sum=Coalesce(Sum("rate"), 0),
+        )
+        .order_by()
+    )
+    books = []
+    for row in rows:
+        book = Book(id=row.pop("book_id"), **row)
+        if book.rates_count:
+            book.rating = (
+                Decimal(book.rates_sum) / book.rates_count
+            ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        books.append(book)
+    Book.objects.bulk_update(books, COUNTERS + ("rating",), batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0011_pendingratingupdate"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="userbookrelation",
+            constraint=models.UniqueConstraint(
+                fields=("user", "book"), name="unique_user_book"
+            ),
+        ),
+    ]
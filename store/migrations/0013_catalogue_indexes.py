@@ -0,0 +1,47 @@
+# Generated by Django 4.2.5 on 2026-10-18 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0012_unique_user_book"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["price", "id"], name="book_price_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["price", "author_name", "id"],
+                name="book_price_author_name_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["author_name", "id"], name="book_author_name_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userbookrelation",
+            index=models.Index(
+                condition=models.Q(("like", True)),
+                fields=["book"],
+                name="relation_book_liked_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userbookrelation",
+            index=models.Index(
+                condition=models.Q(("rate__isnull", False)),
+                fields=["book"],
+                name="relation_book_rated_idx",
+            ),
+        ),
+    ]
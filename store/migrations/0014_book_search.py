@@ -0,0 +1,67 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:27
+
+from django.db import DatabaseError, migrations, transaction
+
+SEARCH_SQL = [
+    """
+    ALTER TABLE store_book ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(author_name, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX book_search_vector_idx ON store_book "
+    "USING gin (search_vector)",
+]
+
+TRIGRAM_SQL = [
+    "CREATE INDEX book_name_trgm_idx ON store_book "
+    "USING gin (name gin_trgm_ops)",
+    "CREATE INDEX book_author_name_trgm_idx ON store_book "
+    "USING gin (author_name gin_trgm_ops)",
+]
+
+REVERSE_SEARCH_SQL = [
+    "DROP INDEX IF EXISTS book_author_name_trgm_idx",
+    "DROP INDEX IF EXISTS book_name_trgm_idx",
+    "ALTER TABLE store_book DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def install_trigram(schema_editor) -> bool:
+    #  pg_trgm needs the contrib package and the CREATE privilege; without
+    #  it `search_mode=trigram` falls back to `icontains`, see store.filters
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        return False
+    return True
+
+
+def create_search(apps, schema_editor) -> None:
+    #  other databases fall back to `icontains` search, see store.filters
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for statement in SEARCH_SQL:
+        schema_editor.execute(statement)
+    if install_trigram(schema_editor):
+        for statement in TRIGRAM_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_search(apps, schema_editor) -> None:
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for statement in REVERSE_SEARCH_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0013_catalogue_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0014_book_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userbookrelation",
+            index=models.Index(
+                fields=["book", "-id"], name="relation_book_id_idx"
+            ),
+        ),
+    ]
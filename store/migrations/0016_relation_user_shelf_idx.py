@@ -0,0 +1,40 @@
+# Generated by Django 4.2.5 on 2026-10-18 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0015_relation_book_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userbookrelation",
+            index=models.Index(
+                condition=models.Q(("in_bookmarks", True)),
+                fields=["user", "-id"],
+                include=("book", "like", "in_bookmarks", "rate"),
+                name="relation_user_bookmarks_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userbookrelation",
+            index=models.Index(
+                condition=models.Q(("like", True)),
+                fields=["user", "-id"],
+                include=("book", "like", "in_bookmarks", "rate"),
+                name="relation_user_likes_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userbookrelation",
+            index=models.Index(
+                condition=models.Q(("rate__isnull", False)),
+                fields=["user", "-id"],
+                include=("book", "like", "in_bookmarks", "rate"),
+                name="relation_user_rated_idx",
+            ),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, router
 
 
 class Book(models.Model):
@@ -15,6 +15,23 @@ class Book(models.Model):
     rating = models.DecimalField(
         max_digits=3, decimal_places=2, default=None, null=True
     )
+    likes_count = models.PositiveIntegerField(default=0)
+    bookmarks_count = models.PositiveIntegerField(default=0)
+    rates_count = models.PositiveIntegerField(default=0)
+    rates_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            #  `id` is the keyset pagination tiebreaker
+            models.Index(fields=["price", "id"], name="book_price_id_idx"),
+            models.Index(
+                fields=["price", "author_name", "id"],
+                name="book_price_author_name_id_idx",
+            ),
+            models.Index(
+                fields=["author_name", "id"], name="book_author_name_id_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Id {self.id}: {self.name}"
@@ -38,9 +55,68 @@ class UserBookRelation(models.Model):
     in_bookmarks = models.BooleanField(default=False)
     rate = models.PositiveSmallIntegerField(choices=RATE_CHOICES, null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "book"], name="unique_user_book"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["book"],
+                condition=models.Q(like=True),
+                name="relation_book_liked_idx",
+            ),
+            models.Index(
+                fields=["book"],
+                condition=models.Q(rate__isnull=False),
+                name="relation_book_rated_idx",
+            ),
+            #  newest readers of a book, see store.logic.get_readers_preview
+            models.Index(fields=["book", "-id"], name="relation_book_id_idx"),
+            #  a user's shelves, newest first, see store.views.LibraryView;
+            #  the included columns are all a page reads from the relation
+            models.Index(
+                fields=["user", "-id"],
+                include=["book", "like", "in_bookmarks", "rate"],
+                condition=models.Q(in_bookmarks=True),
+                name="relation_user_bookmarks_idx",
+            ),
+            models.Index(
+                fields=["user", "-id"],
+                include=["book", "like", "in_bookmarks", "rate"],
+                condition=models.Q(like=True),
+                name="relation_user_likes_idx",
+            ),
+            models.Index(
+                fields=["user", "-id"],
+                include=["book", "like", "in_bookmarks", "rate"],
+                condition=models.Q(rate__isnull=False),
+                name="relation_user_rated_idx",
+            ),
+        ]
+
+    COUNTED_FIELDS = ("like", "in_bookmarks", "rate")
+
+    #  values of COUNTED_FIELDS as they are stored in the database
+    _loaded_state = None
+
     def __str__(self) -> str:
         return f"{self.user.username}: {self.book.name}, RATE {self.rate}"
 
+    @classmethod
+    def from_db(
+        cls, db: str, field_names: list, values: list
+    ) -> "UserBookRelation":
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_state = {
+            field: instance.__dict__.get(field) for field in cls.COUNTED_FIELDS
+        }
+        return instance
+
+    def get_counted_state(self) -> dict:
+        return {field: getattr(self, field) for field in self.COUNTED_FIELDS}
+
     def save(
         self,
         force_insert: bool = False,
@@ -48,11 +124,40 @@ class UserBookRelation(models.Model):
         using: str = None,
         update_fields: list = None,
     ) -> None:
-        from store.logic import set_rating
-
-        creating = not self.pk
-        old_rating = self.rate
-        super().save()
-        new_rating = self.rate
-        if old_rating != new_rating or creating:
-            set_rating(self.book)
+        from store.logic import update_counters
+
+        using = using or router.db_for_write(type(self), instance=self)
+        old_state = self._loaded_state
+        if old_state is None and not self._state.adding:
+            old_state = (
+                UserBookRelation.objects.using(using)
+                .filter(pk=self.pk)
+                .values(*self.COUNTED_FIELDS)
+                .first()
+            )
+        new_state = self.get_counted_state()
+        if update_fields is not None and old_state is not None:
+            #  fields left out of update_fields keep their stored value
+            new_state = {
+                field: new_state[field] if field in update_fields else value
+                for field, value in old_state.items()
+            }
+        super().save(
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields,
+        )
+        self._loaded_state = new_state
+        #  counters and rating are moved by the delta in a single UPDATE
+        update_counters(self.book_id, old_state, new_state, using)
+
+
+class PendingRatingUpdate(models.Model):
+    #  one row per book waiting for a deferred rating recomputation
+    book = models.OneToOneField(
+        Book, on_delete=models.CASCADE, related_name="+"
+    )
+
+    def __str__(self) -> str:
+        return f"Pending rating of book {self.book_id}"
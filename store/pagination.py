@@ -0,0 +1,247 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Model, Q, QuerySet
+from django.views import View
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # paging is opt-in: without `cursor` or `page_size` in the query string
+    # the whole list is returned as before
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 20
+    max_page_size = 100
+    tiebreaker = "id"
+    invalid_cursor_message = "Invalid cursor"
+
+    def is_requested(self, request: Request) -> bool:
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view: View = None
+    ) -> list | None:
+        if not self.is_requested(request):
+            return None
+        return self.set_page(
+            list(self.get_page_queryset(queryset, request, view))
+        )
+
+    async def apaginate_queryset(
+        self, queryset: QuerySet, request: Request, view: View = None
+    ) -> list | None:
+        if not self.is_requested(request):
+            return None
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        return self.set_page([obj async for obj in page_queryset])
+
+    def get_page_queryset(
+        self, queryset: QuerySet, request: Request, view: View = None
+    ) -> QuerySet:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.position, self.reverse = self.decode_cursor(request, queryset)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._flip(field) for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(
+                self.keyset_filter(ordering, self.position)
+            )
+        #  one extra row tells whether there is a page after this one
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results: list) -> list:
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(
+        self, request: Request, queryset: QuerySet, view: View
+    ) -> list:
+        ordering = None
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            #  the order the filters left, like the search rank of
+            #  store.filters.BookSearchFilter
+            ordering = [
+                field
+                for field in queryset.query.order_by
+                if isinstance(field, str)
+            ]
+
+        fields = [
+            field
+            for field in ordering or ()
+            if field.lstrip("-") != self.tiebreaker
+        ]
+        tiebreakers = [
+            field
+            for field in ordering or ()
+            if field.lstrip("-") == self.tiebreaker
+        ]
+        if tiebreakers:
+            #  the direction the queryset already breaks ties in
+            fields.append(tiebreakers[0])
+        else:
+            descending = bool(fields) and fields[0].startswith("-")
+            fields.append(
+                f"-{self.tiebreaker}" if descending else self.tiebreaker
+            )
+        return fields
+
+    def keyset_filter(self, ordering: list, position: list) -> Q:
+        #  (a, b) > (x, y)  <=>  a >= x AND (a > x OR (a = x AND b > y));
+        #  the redundant `a >= x` lets the database range-scan an index
+        first = ordering[0]
+        bound = "lte" if first.startswith("-") else "gte"
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            branch = Q(**{f"{name}__{lookup}": position[index]})
+            for prev_field, value in zip(ordering[:index], position):
+                branch &= Q(**{prev_field.lstrip("-"): value})
+            condition |= branch
+        return Q(**{f"{first.lstrip('-')}__{bound}": position[0]}) & condition
+
+    def get_position(self, obj: Model) -> list:
+        position = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            position.append(
+                str(value) if isinstance(value, Decimal) else value
+            )
+        return position
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+    def encode_cursor(self, position: list, reverse: bool) -> str:
+        payload = json.dumps(
+            {"o": self.ordering, "p": position, "r": int(reverse)},
+            separators=(",", ":"),
+        )
+        encoded = urlsafe_b64encode(payload.encode()).decode("ascii")
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.cursor_query_param, encoded)
+        return replace_query_param(
+            url, self.page_size_query_param, self.page_size
+        )
+
+    def decode_cursor(self, request: Request, queryset: QuerySet) -> tuple:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            ordering, position = cursor["o"], cursor["p"]
+            reverse = bool(int(cursor.get("r", 0)))
+            if not isinstance(position, list):
+                raise TypeError(position)
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        #  a cursor is only valid for the ordering it was issued for
+        if ordering != self.ordering or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        #  values the ordering fields cannot hold would fail in the query
+        try:
+            position = [
+                self.to_python(queryset, field.lstrip("-"), value)
+                for field, value in zip(ordering, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def to_python(queryset: QuerySet, name: str, value: object) -> object:
+        #  the keyset lookups cannot compare with NULL
+        if value is None:
+            raise ValueError(name)
+        if name in queryset.query.annotations:
+            field = queryset.query.annotations[name].output_field
+        else:
+            field = queryset.model._meta.get_field(name)
+        return field.to_python(value)
+
+    @staticmethod
+    def _flip(field: str) -> str:
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class ReadersPagination(KeysetPagination):
+    #  always paged, the newest relations first
+    def is_requested(self, request: Request) -> bool:
+        return True
+
+    def get_ordering(
+        self, request: Request, queryset: QuerySet, view: View
+    ) -> list:
+        return [f"-{self.tiebreaker}"]
+
+
+class LibraryPagination(ReadersPagination):
+    #  a user's books by their relation, the newest first; see
+    #  store.views.LibraryView
+    tiebreaker = "relation_id"
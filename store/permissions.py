@@ -1,16 +1,39 @@
-from django.contrib.auth.models import User
+from django.db.models import Model, QuerySet
 from django.http import HttpRequest
 from django.views import View
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
 class IsOwnerOrStaffOrReadOnly(BasePermission):
+    # compares the owner's primary key, so checking an object never loads
+    # its owner; `filter_editable` applies the same rule to a whole queryset
+    owner_field = "owner"
+
     def has_object_permission(
-        self, request: HttpRequest, view: View, obj: User
+        self, request: HttpRequest, view: View, obj: Model
     ) -> bool:
         return bool(
-            request.method in SAFE_METHODS
-            or request.user
-            and request.user.is_authenticated
-            and (obj.owner == request.user or request.user.is_staff)
+            request.method in SAFE_METHODS or self.can_edit(request, obj)
         )
+
+    def can_edit(self, request: HttpRequest, obj: Model) -> bool:
+        user = request.user
+        return bool(
+            user
+            and user.is_authenticated
+            and (
+                user.is_staff
+                or getattr(obj, f"{self.owner_field}_id") == user.pk
+            )
+        )
+
+    def filter_editable(
+        self, request: HttpRequest, queryset: QuerySet
+    ) -> QuerySet:
+        #  the objects of `queryset` the user may change or delete
+        user = request.user
+        if not user or not user.is_authenticated:
+            return queryset.none()
+        if user.is_staff:
+            return queryset
+        return queryset.filter(**{f"{self.owner_field}_id": user.pk})
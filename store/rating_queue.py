@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils.module_loading import import_string
+
+from store.models import PendingRatingUpdate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "store.rating_queue.DatabaseRatingQueue"
+
+#  ids of the books rated inside the innermost batched() block
+_batch = ContextVar("rating_batch", default=None)
+
+
+class MemoryRatingQueue:
+    # pending book ids live in this process only; pair it with
+    # RATING_QUEUE_WORKER_INTERVAL or call flush() yourself
+    def __init__(self) -> None:
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def push(self, book_ids: list) -> None:
+        #  like rows of the database queue, ids are only queued once the
+        #  transaction that rated the books commits
+        transaction.on_commit(lambda: self._add(book_ids))
+
+    def _add(self, book_ids: list) -> None:
+        with self._lock:
+            #  a dict keeps insertion order and coalesces repeated ids
+            self._pending.update(dict.fromkeys(book_ids))
+        self._start_worker()
+
+    def pop(self, limit: int) -> list:
+        with self._lock:
+            book_ids = list(self._pending)[:limit]
+            for book_id in book_ids:
+                del self._pending[book_id]
+        return book_ids
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _start_worker(self) -> None:
+        interval = getattr(settings, "RATING_QUEUE_WORKER_INTERVAL", None)
+        if not interval or self._worker is not None:
+            return
+        self._worker = threading.Thread(
+            target=self._run_worker, args=(interval,), daemon=True
+        )
+        self._worker.start()
+
+    def _run_worker(self, interval: float) -> None:
+        try:
+            run_worker(interval)
+        finally:
+            #  the next push starts a new one
+            self._worker = None
+
+
+class DatabaseRatingQueue:
+    # survives restarts and is shared between processes; drain it with
+    # `manage.py process_rating_queue`
+    def push(self, book_ids: list) -> None:
+        PendingRatingUpdate.objects.bulk_create(
+            [PendingRatingUpdate(book_id=book_id) for book_id in book_ids],
+            ignore_conflicts=True,
+        )
+
+    def pop(self, limit: int) -> list:
+        with transaction.atomic():
+            pending = list(
+                PendingRatingUpdate.objects.select_for_update(skip_locked=True)
+                .order_by("id")
+                .values_list("id", "book_id")[:limit]
+            )
+            if pending:
+                PendingRatingUpdate.objects.filter(
+                    id__in=[pk for pk, _ in pending]
+                ).delete()
+        return [book_id for _, book_id in pending]
+
+    def __len__(self) -> int:
+        return PendingRatingUpdate.objects.count()
+
+
+_queues = {}
+
+
+def get_queue() -> MemoryRatingQueue | DatabaseRatingQueue:
+    path = getattr(settings, "RATING_QUEUE_BACKEND", DEFAULT_BACKEND)
+    if path not in _queues:
+        _queues[path] = import_string(path)()
+    return _queues[path]
+
+
+def is_deferred() -> bool:
+    return getattr(settings, "RATING_UPDATES", "inline") == "deferred"
+
+
+def is_batched() -> bool:
+    return _batch.get() is not None
+
+
+def enqueue(book_ids: list) -> None:
+    batch = _batch.get()
+    if batch is not None:
+        batch.update(dict.fromkeys(book_ids))
+    else:
+        get_queue().push(book_ids)
+
+
+@contextmanager
+def batched() -> Iterator[None]:
+    #  ratings of books rated inside the block are recomputed in one pass
+    #  when it exits, whatever RATING_UPDATES says; nested blocks join the
+    #  outer one
+    if is_batched():
+        yield
+        return
+    book_ids = {}
+    token = _batch.set(book_ids)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        #  recounting is idempotent, but not possible in a broken
+        #  transaction, which discards the rates anyway
+        if book_ids and not connection.needs_rollback:
+            from store.logic import recompute_ratings
+
+            recompute_ratings(list(book_ids))
+
+
+def process_batch(batch_size: int = None) -> int:
+    from store.logic import recompute_ratings
+
+    batch_size = batch_size or getattr(
+        settings, "RATING_QUEUE_BATCH_SIZE", 500
+    )
+    book_ids = get_queue().pop(batch_size)
+    if book_ids:
+        recompute_ratings(book_ids)
+    return len(book_ids)
+
+
+def flush(batch_size: int = None) -> int:
+    processed = 0
+    while count := process_batch(batch_size):
+        processed += count
+    return processed
+
+
+def run_worker(interval: float, batch_size: int = None) -> None:
+    #  sleeping between drains is what coalesces bursts of rates
+    while True:
+        time.sleep(interval)
+        close_old_connections()
+        try:
+            flush(batch_size)
+        except Exception:
+            #  a failed batch must not stop the later ones
+            logger.exception("Rating queue flush failed")
+        finally:
+            close_old_connections()
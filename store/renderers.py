@@ -0,0 +1,105 @@
+import csv
+from typing import Any, Iterable, Iterator
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+#  types orjson does not know natively (Decimal, lazy strings, ...) and
+#  datetimes go through DRF's encoder, so the output matches JSONRenderer
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+)
+
+
+def dumps(data: Any) -> bytes:
+    #  compact, unicode JSON byte-compatible with DRF's JSONRenderer
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(
+                data, default=JSONEncoder().default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            pass
+        else:
+            #  JavaScript line terminators are escaped like DRF does
+            if b"\xe2\x80" in encoded:
+                encoded = encoded.replace(
+                    "\u2028".encode(), b"\\u2028"
+                ).replace("\u2029".encode(), b"\\u2029")
+            return encoded
+    return JSONRenderer().render(data)
+
+
+class ORJSONRenderer(JSONRenderer):
+    # falls back to JSONRenderer for indented output, ensure_ascii and
+    # values orjson cannot encode (e.g. integers over 64 bits)
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str = None,
+        renderer_context: dict = None,
+    ) -> bytes:
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None
+            or indent is not None
+            or not self.compact
+            or self.ensure_ascii
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class StreamingRenderer(BaseRenderer):
+    # `render_stream` yields the body row by row for StreamingHttpResponse;
+    # `render` is still used for error responses of the same request
+    charset = "utf-8"
+
+    def render(
+        self,
+        data: list | dict,
+        accepted_media_type: str = None,
+        renderer_context: dict = None,
+    ) -> bytes:
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return b"".join(
+            chunk if isinstance(chunk, bytes) else chunk.encode(self.charset)
+            for chunk in self.render_stream(rows, fields)
+        )
+
+    def render_stream(self, rows: Iterable, fields: list) -> Iterator:
+        raise NotImplementedError
+
+
+class JSONLinesRenderer(StreamingRenderer):
+    media_type = "application/x-ndjson"
+    format = "jsonl"
+
+    def render_stream(self, rows: Iterable, fields: list) -> Iterator[bytes]:
+        for row in rows:
+            yield dumps(row) + b"\n"
+
+
+class Echo:
+    #  file-like object handing back what csv.writer writes to it
+    def write(self, value: str) -> str:
+        return value
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def render_stream(self, rows: Iterable, fields: list) -> Iterator[str]:
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row.get(field) for field in fields)
@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser, AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Model
+from rest_framework.routers import SimpleRouter
+
+REPLICA_DB_ALIAS = "replica"
+PIN_KEY = "db-pin:{}"
+
+#  whether reads of the current request may go to the replica
+replica_reads_enabled = ContextVar("replica_reads_enabled", default=False)
+
+
+def replica_configured() -> bool:
+    #  a replica that is the primary (or its test mirror) is not worth a
+    #  second connection
+    if REPLICA_DB_ALIAS not in settings.DATABASES:
+        return False
+    replica = connections[REPLICA_DB_ALIAS].settings_dict
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict
+    return any(
+        replica.get(key) != primary.get(key)
+        for key in ("ENGINE", "NAME", "HOST", "PORT")
+    )
+
+
+def reads_from_replica() -> bool:
+    #  whether reads of the current request go to the replica
+    return replica_reads_enabled.get() and replica_configured()
+
+
+@contextmanager
+def replica_reads(enabled: bool = True) -> Iterator[None]:
+    token = replica_reads_enabled.set(enabled)
+    try:
+        yield
+    finally:
+        replica_reads_enabled.reset(token)
+
+
+def pin_to_primary(user: AbstractBaseUser | AnonymousUser) -> None:
+    #  read-your-writes: the user's next reads skip the lagging replica
+    if user.is_authenticated:
+        cache.set(
+            PIN_KEY.format(user.pk),
+            True,
+            getattr(settings, "REPLICA_PIN_SECONDS", 10),
+        )
+
+
+def is_pinned(user: AbstractBaseUser | AnonymousUser) -> bool:
+    return user.is_authenticated and bool(cache.get(PIN_KEY.format(user.pk)))
+
+
+class PrimaryReplicaRouter:
+    # writes always go to the primary; reads go to the replica only inside
+    # replica_reads(), see store.views.ReplicaReadsMixin
+    def db_for_read(self, model: type[Model], **hints) -> str | None:
+        if reads_from_replica():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model: type[Model], **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        #  the replica gets its schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class BulkRouter(SimpleRouter):
+    # list routes also accept PATCH and DELETE, mapped to the viewset's
+    # bulk_update and bulk_destroy if it has them; see
+    # store.views.BookViewSet
+    routes = [
+        SimpleRouter.routes[0]._replace(
+            mapping={
+                **SimpleRouter.routes[0].mapping,
+                "patch": "bulk_update",
+                "delete": "bulk_destroy",
+            }
+        ),
+        *SimpleRouter.routes[1:],
+    ]
@@ -1,17 +1,43 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
+from store.metrics import serializer_timer
 from store.models import Book, UserBookRelation
 
 
+class TimedSerializerMixin:
+    #  time spent building `.data` is reported to store.metrics
+    @property
+    def data(self) -> dict | list:
+        with serializer_timer():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
 class BookReaderSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("first_name", "last_name")
 
 
-class BooksSerializer(serializers.ModelSerializer):
-    annotated_likes = serializers.IntegerField(read_only=True)
+class SparseFieldsMixin:
+    #  `fields=` keeps only the named fields, in their declared order
+    def __init__(self, *args, fields: set = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class BooksSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
+    annotated_likes = serializers.IntegerField(
+        source="likes_count", read_only=True
+    )
     rating = serializers.DecimalField(
         max_digits=3, decimal_places=2, read_only=True
     )
@@ -19,9 +45,16 @@ class BooksSerializer(serializers.ModelSerializer):
         source="owner.username", default="", read_only=True
     )
     readers = BookReaderSerializer(many=True, read_only=True)
+    #  relation of the requesting user, annotated by
+    #  store.logic.annotate_user_state; the defaults are for everyone else
+    is_liked = serializers.BooleanField(default=False, read_only=True)
+    in_bookmarks = serializers.BooleanField(default=False, read_only=True)
+    my_rate = serializers.IntegerField(default=None, read_only=True)
 
     class Meta:
         model = Book
+        #  differ between users, so they are never part of cached rows
+        user_state_fields = ("is_liked", "in_bookmarks", "my_rate")
         fields = (
             "id",
             "name",
@@ -31,10 +64,56 @@ class BooksSerializer(serializers.ModelSerializer):
             "rating",
             "owner_name",
             "readers",
+        ) + user_state_fields
+        list_serializer_class = TimedListSerializer
+
+
+class BookPreviewSerializer(BooksSerializer):
+    #  readers are capped, the full list is served by /book/<id>/readers/
+    readers_count = serializers.IntegerField(default=0, read_only=True)
+    readers_preview = BookReaderSerializer(
+        many=True, default=list, read_only=True
+    )
+
+    class Meta(BooksSerializer.Meta):
+        fields = (
+            "id",
+            "name",
+            "price",
+            "author_name",
+            "annotated_likes",
+            "rating",
+            "owner_name",
+            "readers_count",
+            "readers_preview",
+        ) + BooksSerializer.Meta.user_state_fields
+
+
+class UserBookRelationSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
+    class Meta:
+        model = UserBookRelation
+        fields = ("book", "like", "in_bookmarks", "rate")
+
+    def update(
+        self, instance: UserBookRelation, validated_data: dict
+    ) -> UserBookRelation:
+        #  a stored relation only writes the columns sent by the client
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(
+            update_fields=(
+                None if instance._state.adding else list(validated_data)
+            )
         )
+        return instance
+
 
+class UserBookRelationBulkSerializer(serializers.ModelSerializer):
+    #  books are looked up for the whole batch in store.logic
+    book = serializers.IntegerField()
 
-class UserBookRelationSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserBookRelation
         fields = ("book", "like", "in_bookmarks", "rate")
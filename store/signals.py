@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from store.cache import invalidate_books
+from store.logic import update_counters
+from store.metrics import record_query
+from store.models import Book, UserBookRelation
+
+
+@receiver(post_delete, sender=UserBookRelation)
+def relation_deleted(
+    sender: type, instance: UserBookRelation, **kwargs
+) -> None:
+    #  also runs for relations removed by a cascade from User;
+    #  a deleted book has no counters left to maintain
+    origin = kwargs.get("origin")
+    if isinstance(origin, Book) or (
+        isinstance(origin, QuerySet) and origin.model is Book
+    ):
+        return
+    stored = instance._loaded_state or instance.get_counted_state()
+    update_counters(instance.book_id, stored, None)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender: type, instance: Book, **kwargs) -> None:
+    invalidate_books([instance.pk])
+
+
+@receiver(post_save, sender=UserBookRelation)
+@receiver(post_delete, sender=UserBookRelation)
+def relation_changed(
+    sender: type, instance: UserBookRelation, **kwargs
+) -> None:
+    #  bookmarks are shown to their users only, who never get cached data;
+    #  an existing reader bookmarking a book leaves its row as it was
+    if kwargs.get("created") is False:
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            changed = set(update_fields)
+        elif instance._loaded_state is not None:
+            changed = {
+                field
+                for field, value in instance._loaded_state.items()
+                if value != getattr(instance, field)
+            }
+        else:
+            changed = None
+        if changed is not None and changed <= {"in_bookmarks"}:
+            return
+    invalidate_books([instance.book_id])
+
+
+@receiver(post_save, sender=User)
+def user_changed(
+    sender: type, instance: User, update_fields: frozenset, **kwargs
+) -> None:
+    #  owners and readers are rendered by name; logins change nothing
+    if kwargs.get("created") or (
+        update_fields and set(update_fields) <= {"last_login"}
+    ):
+        return
+    invalidate_books(
+        Book.objects.filter(Q(owner=instance) | Q(readers=instance))
+        .values_list("id", flat=True)
+        .distinct()
+    )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender: type, instance: User, **kwargs) -> None:
+    #  owned books lose their owner through an UPDATE that sends no
+    #  post_save, so their ids are collected while they still point here
+    invalidate_books(
+        list(
+            Book.objects.filter(Q(owner=instance) | Q(readers=instance))
+            .values_list("id", flat=True)
+            .distinct()
+        )
+    )
+
+
+@receiver(connection_created)
+def connection_opened(sender: type, connection: object, **kwargs) -> None:
+    #  a connection is reopened by the same wrapper after it was closed
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
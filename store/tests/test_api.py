@@ -1,7 +1,10 @@
 import json
+from base64 import urlsafe_b64encode
+from unittest import skipUnless
 
 from django.contrib.auth.models import User
-from django.db import connection
+from django.core.cache import cache
+from django.db import IntegrityError, connection
 from django.db.models import Count, Case, When
 from django.urls import reverse
 from django.test.utils import CaptureQueriesContext
@@ -9,6 +12,7 @@ from rest_framework import status
 from rest_framework.exceptions import ErrorDetail
 from rest_framework.test import APITestCase
 
+from store.filters import trigram_installed
 from store.models import Book, UserBookRelation
 from store.serializers import BooksSerializer
 
@@ -92,6 +96,569 @@ class BooksApiTestCase(APITestCase):
             BooksSerializer(books, many=True).data[0]["annotated_likes"], 1
         )
 
+    def test_get_search_mode_fallback(self) -> None:
+        url = reverse("book-list")
+        expected = self.client.get(url, data={"search": "Author 1"}).data
+        for mode in ("contains", "fts", "trigram"):
+            response = self.client.get(
+                url, data={"search": "Author 1", "search_mode": mode}
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            if connection.vendor != "postgresql" or (
+                mode == "trigram" and not trigram_installed(connection.alias)
+            ):
+                self.assertEqual(expected, response.data)
+
+    def test_get_search_mode_wrong(self) -> None:
+        url = reverse("book-list")
+        response = self.client.get(
+            url, data={"search": "Author", "search_mode": "regex"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == "postgresql", "needs PostgreSQL")
+    def test_get_search_fts(self) -> None:
+        url = reverse("book-list")
+        response = self.client.get(
+            url, data={"search": "author 3", "search_mode": "fts"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [self.book_3.id], [book["id"] for book in response.data]
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "needs PostgreSQL")
+    def test_get_search_trigram(self) -> None:
+        if not trigram_installed(connection.alias):
+            self.skipTest("needs the pg_trgm extension")
+        url = reverse("book-list")
+        #  typo-tolerant: "Autor" still finds "Author 2"
+        response = self.client.get(
+            url, data={"search": "Autor 2", "search_mode": "trigram"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.book_2.id, response.data[0]["id"])
+
+    @skipUnless(connection.vendor == "postgresql", "needs PostgreSQL")
+    def test_get_search_paginated(self) -> None:
+        Book.objects.create(
+            name="Author", price="10", author_name="Author Author"
+        )
+        url = reverse("book-list")
+        for mode in ("fts", "trigram"):
+            data = {"search": "author", "search_mode": mode}
+            expected = [
+                book["id"] for book in self.client.get(url, data=data).data
+            ]
+            response = self.client.get(url, data={**data, "page_size": 1})
+            ids = [book["id"] for book in response.data["results"]]
+            while response.data["next"]:
+                response = self.client.get(response.data["next"])
+                ids += [book["id"] for book in response.data["results"]]
+
+            #  pages follow the rank, equal ranks by id
+            self.assertEqual(4, len(expected))
+            self.assertEqual(expected, ids)
+
+    def test_get_paginated(self) -> None:
+        url = reverse("book-list")
+        response = self.client.get(url, data={"page_size": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [self.book_1.id, self.book_2.id],
+            [book["id"] for book in response.data["results"]],
+        )
+        self.assertIsNone(response.data["previous"])
+
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.get(response.data["next"])
+            self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            [self.book_3.id],
+            [book["id"] for book in response.data["results"]],
+        )
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [self.book_1.id, self.book_2.id],
+            [book["id"] for book in response.data["results"]],
+        )
+        self.assertIsNone(response.data["previous"])
+
+    def test_get_paginated_ordering(self) -> None:
+        url = reverse("book-list")
+        response = self.client.get(
+            url, data={"page_size": 1, "ordering": "-price"}
+        )
+        ids = [book["id"] for book in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            ids += [book["id"] for book in response.data["results"]]
+
+        #  equal prices are ordered by the `id` tiebreaker
+        self.assertEqual([self.book_3.id, self.book_2.id, self.book_1.id], ids)
+
+    def test_get_paginated_invalid_cursor(self) -> None:
+        url = reverse("book-list")
+        cursors = ["broken"] + [
+            urlsafe_b64encode(payload).decode()
+            for payload in (
+                b'{"o":["id"],"p":5,"r":false}',
+                b'{"o":["id"],"p":["abc"]}',
+                b'{"o":["id"],"p":[null]}',
+                b'{"o":["id"],"p":[[1]]}',
+            )
+        ]
+        for cursor in cursors:
+            response = self.client.get(url, data={"cursor": cursor})
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_cached(self) -> None:
+        url = reverse("book-list")
+        response = self.client.get(url, data={"price": 55})
+
+        with CaptureQueriesContext(connection=connection) as queries:
+            cached = self.client.get(url, data={"price": 55})
+            self.assertEqual(len(queries), 0)
+        self.assertEqual(response.data, cached.data)
+        self.assertEqual(response["ETag"], cached["ETag"])
+
+        not_modified = self.client.get(
+            url, data={"price": 55}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEqual(response["ETag"], not_modified["ETag"])
+
+        UserBookRelation.objects.create(
+            user=self.user, book=self.book_2, like=True
+        )
+        response = self.client.get(
+            url, data={"price": 55}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(1, response.data[0]["annotated_likes"])
+
+    def test_get_cached_bookmarks(self) -> None:
+        url = reverse("book-list")
+        etag = self.client.get(url)["ETag"]
+
+        #  bookmarks of an existing reader are not part of shared lists
+        relation = UserBookRelation.objects.get(
+            user=self.user, book=self.book_1
+        )
+        relation.in_bookmarks = True
+        relation.save()
+        relation.in_bookmarks = False
+        relation.save(update_fields=["in_bookmarks"])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        relation.like = False
+        relation.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_cached_not_for_users(self) -> None:
+        url = reverse("book-list")
+        self.client.get(url)
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.get(url)
+            self.assertGreater(len(queries), 0)
+        self.assertNotIn("ETag", response)
+
+    def test_get_cached_rows(self) -> None:
+        url = reverse("book-list")
+        self.client.force_authenticate(self.user)
+        self.client.get(url)
+
+        #  rows come from the cache, readers are not prefetched again
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.get(url)
+            self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            [{"first_name": "", "last_name": ""}], response.data[0]["readers"]
+        )
+
+        self.user.first_name = "Ivan"
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(
+            [{"first_name": "Ivan", "last_name": ""}],
+            response.data[0]["readers"],
+        )
+
+    def test_get_cached_rows_owner_deleted(self) -> None:
+        url = reverse("book-list")
+        owner = User.objects.create(username="owner")
+        self.book_2.owner = owner
+        self.book_2.save()
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+        self.assertEqual("owner", response.data[1]["owner_name"])
+
+        #  the owner is removed by an UPDATE that sends no post_save
+        owner.delete()
+        response = self.client.get(url)
+        self.assertEqual("", response.data[1]["owner_name"])
+
+    def test_get_user_state(self) -> None:
+        url = reverse("book-list")
+        user2 = User.objects.create(username="test username2")
+        for user in (self.user, user2):
+            for book in (self.book_2, self.book_3):
+                UserBookRelation.objects.create(
+                    user=user, book=book, in_bookmarks=True
+                )
+        relations = UserBookRelation.objects.count()
+        self.client.force_login(self.user)
+
+        #  session, user, books with the user's relations and readers, for
+        #  any page size
+        for page_size in (1, 3):
+            cache.clear()
+            with CaptureQueriesContext(connection=connection) as queries:
+                response = self.client.get(url, data={"page_size": page_size})
+            self.assertEqual(len(queries), 4)
+            self.assertEqual(len(response.data["results"]), page_size)
+
+        state = [
+            (book["is_liked"], book["in_bookmarks"], book["my_rate"])
+            for book in response.data["results"]
+        ]
+        self.assertEqual(
+            [(True, False, 5), (False, True, None), (False, True, None)],
+            state,
+        )
+
+        #  cached rows carry no user state
+        self.client.force_login(user2)
+        response = self.client.get(url)
+        self.assertEqual(
+            [False, False, False], [book["is_liked"] for book in response.data]
+        )
+        response = self.client.get(
+            reverse("book-detail", args=(self.book_1.id,))
+        )
+        self.assertFalse(response.data["is_liked"])
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("book-detail", args=(self.book_1.id,))
+        )
+        self.assertEqual(5, response.data["my_rate"])
+        response = self.client.get(url, data={"fields": "id,is_liked"})
+        self.assertEqual(
+            {"id": self.book_1.id, "is_liked": True}, response.data[0]
+        )
+
+        self.client.logout()
+        response = self.client.get(url)
+        self.assertEqual(
+            (False, False, None),
+            (
+                response.data[0]["is_liked"],
+                response.data[0]["in_bookmarks"],
+                response.data[0]["my_rate"],
+            ),
+        )
+        self.assertEqual(relations, UserBookRelation.objects.count())
+
+    def test_get_readers_preview(self) -> None:
+        for index in range(3):
+            reader = User.objects.create(
+                username=f"reader {index}", first_name=f"Reader {index}"
+            )
+            UserBookRelation.objects.create(user=reader, book=self.book_1)
+        url = reverse("book-list")
+
+        with self.settings(BOOK_READERS_PREVIEW_SIZE=2):
+            #  books and one window query for the previews of the page
+            with CaptureQueriesContext(connection=connection) as queries:
+                response = self.client.get(url, data={"readers": "preview"})
+                self.assertEqual(len(queries), 2)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("readers", response.data[0])
+        self.assertEqual(4, response.data[0]["readers_count"])
+        self.assertEqual(
+            [
+                {"first_name": "Reader 2", "last_name": ""},
+                {"first_name": "Reader 1", "last_name": ""},
+            ],
+            response.data[0]["readers_preview"],
+        )
+        self.assertEqual(0, response.data[1]["readers_count"])
+        self.assertEqual([], response.data[1]["readers_preview"])
+
+    def test_get_readers_mode_wrong(self) -> None:
+        url = reverse("book-list")
+        response = self.client.get(url, data={"readers": "all"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_sparse_fields(self) -> None:
+        url = reverse("book-list")
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.get(
+                url, data={"fields": "id,name,price", "ordering": "price"}
+            )
+            #  no readers prefetch, no owner join, no counter columns
+            self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        self.assertNotIn("auth_user", sql)
+        self.assertNotIn("likes_count", sql)
+        self.assertNotIn("author_name", sql)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {"id": self.book_1.id, "name": "Test book_1", "price": "25.00"},
+            response.data[0],
+        )
+
+    def test_get_omit_fields(self) -> None:
+        url = reverse("book-list")
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.get(url, data={"omit": "readers,rating"})
+            self.assertEqual(len(queries), 1)
+        self.assertIn("auth_user", queries[0]["sql"])
+
+        self.assertEqual(
+            [
+                "id",
+                "name",
+                "price",
+                "author_name",
+                "annotated_likes",
+                "owner_name",
+                "is_liked",
+                "in_bookmarks",
+                "my_rate",
+            ],
+            list(response.data[0]),
+        )
+        self.assertEqual("test username", response.data[0]["owner_name"])
+
+        response = self.client.get(
+            url, data={"fields": "id,readers_count", "readers": "preview"}
+        )
+        self.assertEqual(
+            {"id": self.book_1.id, "readers_count": 1}, response.data[0]
+        )
+
+    def test_get_sparse_fields_wrong(self) -> None:
+        url = reverse("book-list")
+        response = self.client.get(url, data={"fields": "id,readers_count"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_jsonl(self) -> None:
+        url = reverse("book-export")
+        response = self.client.get(url, data={"price": 55})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            "application/x-ndjson; charset=utf-8", response["Content-Type"]
+        )
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            {
+                "id": self.book_2.id,
+                "name": "Test book_2",
+                "price": "55.00",
+                "author_name": "Author 2",
+                "annotated_likes": 0,
+                "rating": None,
+                "owner_name": "",
+            },
+            rows[0],
+        )
+        self.assertEqual([self.book_3.id], [row["id"] for row in rows[1:]])
+
+    def test_export_csv(self) -> None:
+        url = reverse("book-export")
+        response = self.client.get(url, data={"format": "csv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            'attachment; filename="books.csv"',
+            response["Content-Disposition"],
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            "id,name,price,author_name,annotated_likes,rating,owner_name",
+            lines[0],
+        )
+        self.assertEqual(
+            f"{self.book_1.id},Test book_1,25.00,Author 1,1,5.00,"
+            f"test username",
+            lines[1],
+        )
+        self.assertEqual(4, len(lines))
+
+    def test_get_book_readers(self) -> None:
+        for index in range(2):
+            reader = User.objects.create(
+                username=f"reader {index}", first_name=f"Reader {index}"
+            )
+            UserBookRelation.objects.create(user=reader, book=self.book_1)
+        url = reverse("book-readers", args=(self.book_1.id,))
+
+        response = self.client.get(url, data={"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            ["Reader 1", "Reader 0"],
+            [reader["first_name"] for reader in response.data["results"]],
+        )
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [{"first_name": "", "last_name": ""}], response.data["results"]
+        )
+        self.assertIsNone(response.data["next"])
+
+        for pk in (0, "abc"):
+            url = reverse("book-readers", args=(pk,))
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_library(self) -> None:
+        UserBookRelation.objects.create(
+            user=self.user, book=self.book_3, in_bookmarks=True, rate=3
+        )
+        UserBookRelation.objects.create(
+            user=self.user, book=self.book_2, like=True, in_bookmarks=True
+        )
+        user2 = User.objects.create(username="test username2")
+        UserBookRelation.objects.create(
+            user=user2, book=self.book_1, in_bookmarks=True
+        )
+        self.client.force_login(self.user)
+
+        #  session, user, the page of books with the user's relations and
+        #  readers
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.get(
+                reverse("my-bookmarks"), data={"page_size": 1}
+            )
+        self.assertEqual(len(queries), 4)
+        #  the shelf condition reuses the join of the user's relation
+        self.assertEqual(
+            1, queries[2]["sql"].count('JOIN "store_userbookrelation"')
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        book = response.data["results"][0]
+        self.assertEqual(self.book_2.id, book["id"])
+        self.assertEqual(
+            (True, True, None),
+            (book["is_liked"], book["in_bookmarks"], book["my_rate"]),
+        )
+        self.assertIn("readers", book)
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [self.book_3.id],
+            [book["id"] for book in response.data["results"]],
+        )
+        self.assertIsNone(response.data["next"])
+
+        for name, ids in (
+            ("my-likes", [self.book_2.id, self.book_1.id]),
+            ("my-rated", [self.book_3.id, self.book_1.id]),
+        ):
+            response = self.client.get(reverse(name))
+            self.assertEqual(
+                ids, [book["id"] for book in response.data["results"]]
+            )
+
+        response = self.client.get(
+            reverse("my-rated"), data={"fields": "id,my_rate"}
+        )
+        self.assertEqual(
+            [
+                {"id": self.book_3.id, "my_rate": 3},
+                {"id": self.book_1.id, "my_rate": 5},
+            ],
+            response.data["results"],
+        )
+
+        self.client.logout()
+        response = self.client.get(reverse("my-bookmarks"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_get_async(self) -> None:
+        UserBookRelation.objects.create(
+            user=User.objects.create(username="reader", first_name="Ivan"),
+            book=self.book_1,
+        )
+        for params in (
+            {},
+            {"price": 55},
+            {"search": "Author 1"},
+            {"page_size": 2, "ordering": "-price"},
+        ):
+            with self.subTest(params=params):
+                expected = self.client.get(reverse("book-list"), data=params)
+                with CaptureQueriesContext(connection=connection) as queries:
+                    response = self.client.get(
+                        reverse("async-book-list"), data=params
+                    )
+                    self.assertEqual(len(queries), 2)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                #  same bytes, apart from the path in pagination links
+                self.assertEqual(
+                    expected.content,
+                    response.content.replace(b"/async/book/", b"/book/"),
+                )
+
+    def test_get_async_next_page(self) -> None:
+        url = reverse("async-book-list")
+        response = self.client.get(url, data={"page_size": 2}).json()
+        response = self.client.get(response["next"]).json()
+
+        self.assertEqual(
+            [self.book_3.id], [book["id"] for book in response["results"]]
+        )
+        self.assertIsNotNone(response["previous"])
+
+    def test_get_async_detail(self) -> None:
+        url = reverse("async-book-detail", args=(self.book_1.id,))
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.client.get(
+                reverse("book-detail", args=(self.book_1.id,))
+            ).data,
+            response.json(),
+        )
+
+        url = reverse("async-book-detail", args=(0,))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual({"detail": "Not found."}, response.json())
+
+    def test_get_async_wrong(self) -> None:
+        url = reverse("async-book-list")
+        response = self.client.get(url, data={"price": "cheap"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("price", response.json())
+
     def test_create(self) -> None:
         self.assertEqual(Book.objects.count(), 3)
         url = reverse("book-list")
@@ -182,6 +749,122 @@ class BooksApiTestCase(APITestCase):
         self.book_1.refresh_from_db()
         self.assertEqual(self.book_1.price, 575)
 
+    def test_bulk_create(self) -> None:
+        url = reverse("book-list")
+        data = [
+            {"name": "Python3", "price": 150, "author_name": "A"},
+            {"name": "Django", "price": "cheap", "author_name": "B"},
+            {"name": "Go", "price": 10, "author_name": "C"},
+        ]
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.post(url, data=data, format="json")
+        #  one INSERT for all books
+        self.assertEqual(1, sum("INSERT" in query["sql"] for query in queries))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            ["created", "invalid", "created"],
+            [item["status"] for item in response.data],
+        )
+        self.assertIn("price", response.data[1]["errors"])
+        books = Book.objects.filter(
+            id__in=[response.data[0]["id"], response.data[2]["id"]]
+        )
+        self.assertEqual(
+            ["Go", "Python3"], sorted(book.name for book in books)
+        )
+        self.assertTrue(all(book.owner == self.user for book in books))
+
+    def test_bulk_update(self) -> None:
+        self.book_4 = Book.objects.create(
+            name="Test book_4",
+            price=5,
+            author_name="Author 4",
+            owner=self.user,
+        )
+        url = reverse("book-list")
+        data = [
+            {"id": self.book_1.id, "price": 575},
+            {"id": self.book_2.id, "price": 1},
+            {"id": self.book_4.id, "name": "Renamed"},
+            {"id": self.book_1.id + 100, "price": 1},
+            {"id": self.book_4.id, "price": "cheap"},
+            {"price": 1},
+        ]
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.patch(url, data=data, format="json")
+        #  a single SELECT checks every book
+        self.assertEqual(
+            1,
+            sum(
+                "store_book" in query["sql"]
+                and query["sql"].startswith("SELECT")
+                for query in queries
+            ),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                "updated",
+                "forbidden",
+                "updated",
+                "not_found",
+                "invalid",
+                "invalid",
+            ],
+            [item["status"] for item in response.data],
+        )
+        self.book_1.refresh_from_db()
+        self.book_2.refresh_from_db()
+        self.book_4.refresh_from_db()
+        self.assertEqual(self.book_1.price, 575)
+        self.assertEqual(self.book_1.name, "Test book_1")
+        self.assertEqual(self.book_2.price, 55)
+        self.assertEqual(self.book_4.name, "Renamed")
+        self.assertEqual(self.book_4.price, 5)
+
+    def test_bulk_delete(self) -> None:
+        url = reverse("book-list")
+        data = [
+            {"id": self.book_1.id},
+            self.book_2.id,
+            self.book_1.id + 100,
+            "x",
+        ]
+        self.client.force_login(self.user)
+        response = self.client.delete(url, data=data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (self.book_1.id, "deleted"),
+                (self.book_2.id, "forbidden"),
+                (self.book_1.id + 100, "not_found"),
+                (None, "invalid"),
+            ],
+            [(item["id"], item["status"]) for item in response.data],
+        )
+        self.assertEqual(
+            [self.book_2.id, self.book_3.id],
+            sorted(Book.objects.values_list("id", flat=True)),
+        )
+        self.assertFalse(UserBookRelation.objects.exists())
+
+    def test_bulk_not_allowed(self) -> None:
+        url = reverse("book-list")
+        response = self.client.delete(
+            url, data=[self.book_1.id], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_login(self.user)
+        response = self.client.patch(url, data={"id": 1}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Book.objects.filter(id=self.book_1.id).exists())
+
 
 class BookRelationTestCase(APITestCase):
     def setUp(self) -> None:
@@ -224,6 +907,20 @@ class BookRelationTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(relation.in_bookmarks)
 
+        #  toggling a flag writes that column only
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.patch(
+                url, data={"like": False}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        update = next(
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('UPDATE "store_userbookrelation"')
+        )
+        self.assertNotIn("in_bookmarks", update)
+        self.assertNotIn("rate", update)
+
     def test_rate(self) -> None:
         url = reverse("userbookrelation-detail", args=(self.book_1.id,))
         data = {"rate": 3}
@@ -251,3 +948,128 @@ class BookRelationTestCase(APITestCase):
         self.assertEqual(
             response.status_code, status.HTTP_400_BAD_REQUEST, response.data
         )
+
+    def test_bulk(self) -> None:
+        UserBookRelation.objects.create(
+            user=self.user, book=self.book_2, like=True, rate=2
+        )
+        url = reverse("userbookrelation-bulk")
+        data = [
+            {"book": self.book_1.id, "like": True, "rate": 4},
+            {"book": self.book_2.id, "rate": 5},
+            {"book": self.book_1.id + 100, "like": True},
+            {"book": self.book_1.id, "rate": 6},
+        ]
+        json_data = json.dumps(data)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            url, data=json_data, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            ["created", "updated", "not_found", "invalid"],
+            [item["status"] for item in response.data],
+        )
+        self.assertIn("rate", response.data[3]["errors"])
+
+        relation = UserBookRelation.objects.get(
+            user=self.user, book=self.book_2
+        )
+        self.assertTrue(relation.like)
+        self.assertEqual(relation.rate, 5)
+        self.book_1.refresh_from_db()
+        self.book_2.refresh_from_db()
+        self.assertEqual(self.book_1.likes_count, 1)
+        self.assertEqual(str(self.book_1.rating), "4.00")
+        self.assertEqual(str(self.book_2.rating), "5.00")
+
+    @skipUnless(connection.features.has_select_for_update, "needs row locks")
+    def test_bulk_locks_books(self) -> None:
+        url = reverse("userbookrelation-bulk")
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.post(
+                url, data=[{"book": self.book_1.id, "rate": 4}], format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = [query["sql"] for query in queries]
+        lock = next(
+            index
+            for index, query in enumerate(sql)
+            if query.startswith("SELECT")
+            and 'FROM "store_book"' in query
+            and query.endswith("FOR UPDATE")
+        )
+        count = next(
+            index
+            for index, query in enumerate(sql)
+            if 'FROM "store_userbookrelation"' in query and "COUNT(" in query
+        )
+        self.assertLess(lock, count)
+
+    def test_bulk_not_list(self) -> None:
+        url = reverse("userbookrelation-bulk")
+        json_data = json.dumps({"book": self.book_1.id})
+        self.client.force_login(self.user)
+        response = self.client.post(
+            url, data=json_data, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rate_queries(self) -> None:
+        url = reverse("userbookrelation-detail", args=(self.book_1.id,))
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(url, data={"rate": 4}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        #  SELECT of the relation, its UPDATE and the counters UPDATE in
+        #  a savepoint
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.patch(url, data={"rate": 2}, format="json")
+            self.assertEqual(len(queries), 5)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            UserBookRelation.objects.filter(
+                user=self.user, book=self.book_1
+            ).count(),
+            1,
+        )
+        self.book_1.refresh_from_db()
+        self.assertEqual(str(self.book_1.rating), "2.00")
+
+    @skipUnless(connection.features.has_select_for_update, "needs row locks")
+    def test_rate_locks_relation(self) -> None:
+        UserBookRelation.objects.create(
+            user=self.user, book=self.book_1, rate=4
+        )
+        url = reverse("userbookrelation-detail", args=(self.book_1.id,))
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection=connection) as queries:
+            response = self.client.patch(url, data={"rate": 2}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        select = next(
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT")
+        )
+        self.assertIn('FROM "store_userbookrelation"', select)
+        self.assertTrue(select.endswith("FOR UPDATE"), select)
+
+    def test_missing_book(self) -> None:
+        self.client.force_authenticate(self.user)
+        for book_id in (0, "abc"):
+            url = f"/book_relation/{book_id}/"
+            response = self.client.patch(url, data={"like": True})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(UserBookRelation.objects.exists())
+
+    def test_unique_relation(self) -> None:
+        UserBookRelation.objects.create(user=self.user, book=self.book_1)
+
+        with self.assertRaises(IntegrityError):
+            UserBookRelation.objects.create(user=self.user, book=self.book_1)
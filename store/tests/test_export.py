@@ -0,0 +1,42 @@
+import tracemalloc
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from store.models import Book
+
+
+class ExportMemoryTestCase(APITestCase):
+    BOOKS = 100_000
+    #  a fully built response of this catalogue takes well over 100 MB
+    MAX_PEAK = 5 * 1024 * 1024
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Book.objects.bulk_create(
+            (
+                Book(
+                    name=f"Book {index}",
+                    price=Decimal(index % 40),
+                    author_name=f"Author {index % 300}",
+                )
+                for index in range(cls.BOOKS)
+            ),
+            batch_size=5000,
+        )
+
+    def test_export_bounded_memory(self) -> None:
+        url = reverse("book-export")
+        tracemalloc.start()
+        try:
+            response = self.client.get(url, data={"format": "jsonl"})
+            lines = sum(
+                chunk.count(b"\n") for chunk in response.streaming_content
+            )
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(self.BOOKS, lines)
+        self.assertLess(peak, self.MAX_PEAK)
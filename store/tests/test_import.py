@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from store.models import Book
+
+
+class ImportBooksTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username="owner")
+        self.book_1 = Book.objects.create(
+            name="Test book_1", price="25", author_name="Author 1"
+        )
+
+    def import_file(self, content: str, suffix: str, *args: str) -> tuple:
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=suffix, delete=False, encoding="utf-8"
+        ) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        out, err = StringIO(), StringIO()
+        call_command("import_books", file.name, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv(self) -> None:
+        out, err = self.import_file(
+            "name,price,author_name,owner\n"
+            "Python3,150,Idiot,owner\n"
+            '"Tab\tand \\ slash",10.5,Someone,\n'
+            "Django,cheap,Author 2,owner\n"
+            "Go,10,Author 3,nobody\n",
+            ".csv",
+            "--chunk-size",
+            "2",
+        )
+
+        self.assertIn("Imported 2 book(s) from 4 row(s)", out)
+        self.assertIn("Row 3: price:", err)
+        self.assertIn("Row 4: owner: Unknown user 'nobody'.", err)
+        book = Book.objects.get(name="Python3")
+        self.assertEqual(book.owner, self.user)
+        self.assertEqual(book.price, 150)
+        self.assertEqual(book.likes_count, 0)
+        self.assertIsNone(book.rating)
+        book = Book.objects.get(author_name="Someone")
+        self.assertEqual(book.name, "Tab\tand \\ slash")
+        self.assertIsNone(book.owner)
+
+    def test_jsonl_upsert(self) -> None:
+        rows = [
+            {"name": "Test book_1", "price": 30, "author_name": "Author 1"},
+            {"name": "New", "price": 5, "author_name": "Author 2"},
+            {"name": "New", "price": 7, "author_name": "Author 2"},
+        ]
+        content = "\n".join(map(json.dumps, rows)) + "\nnot json\n"
+        out, err = self.import_file(
+            content, ".jsonl", "--key", "name", "author_name"
+        )
+
+        self.assertIn("1 created, 1 updated, 1 skipped", out)
+        self.assertIn("Row 4: row: Expected a JSON object.", err)
+        self.assertEqual(Book.objects.count(), 2)
+        self.book_1.refresh_from_db()
+        self.assertEqual(self.book_1.price, 30)
+        self.assertEqual(Book.objects.get(name="New").price, 7)
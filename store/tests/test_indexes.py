@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from store.models import Book, UserBookRelation
+
+
+class ListQueryPlanTestCase(APITestCase):
+    # every paged list/filter/order variant must be served by an index
+    # instead of scanning (and sorting) the whole catalogue
+    VARIANTS = [
+        {},
+        {"price": 7},
+        {"ordering": "price"},
+        {"ordering": "-price"},
+        {"ordering": "author_name"},
+        {"ordering": "-author_name"},
+        {"price": 7, "ordering": "-author_name"},
+    ]
+    TABLES = ("store_book", "store_userbookrelation")
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        users = User.objects.bulk_create(
+            [User(username=f"user{index}") for index in range(50)]
+        )
+        books = Book.objects.bulk_create(
+            [
+                Book(
+                    name=f"Book {index}",
+                    price=Decimal(index % 40),
+                    author_name=f"Author {index % 300}",
+                )
+                for index in range(5000)
+            ]
+        )
+        UserBookRelation.objects.bulk_create(
+            [
+                UserBookRelation(
+                    user=user,
+                    book=book,
+                    like=book.id % 3 == 0,
+                    rate=book.id % 5 or None,
+                )
+                for user in users
+                for book in books[:: 10 + users.index(user)]
+            ]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def explain(self, sql: str) -> list:
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                return [row[3] for row in cursor.fetchall()]
+            cursor.execute(f"EXPLAIN {sql}")
+            return [row[0] for row in cursor.fetchall()]
+
+    def plan_problems(self, sql: str, plan: list) -> list:
+        problems = []
+        for line in plan:
+            if connection.vendor == "sqlite":
+                full_scan = any(
+                    line.startswith(f"SCAN {table}") for table in self.TABLES
+                )
+                #  a plain rowid-ordered scan stops at the LIMIT
+                if "TEMP B-TREE" in line or (full_scan and " WHERE " in sql):
+                    problems.append(line)
+            elif any(f"Seq Scan on {table}" in line for table in self.TABLES):
+                problems.append(line)
+        return problems
+
+    def test_list_plans(self) -> None:
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest("EXPLAIN output is not understood")
+
+        url = reverse("book-list")
+        for variant in self.VARIANTS:
+            params = dict(variant, page_size=20)
+            with CaptureQueriesContext(connection=connection) as first:
+                response = self.client.get(url, data=params)
+            with CaptureQueriesContext(connection=connection) as second:
+                self.client.get(response.data["next"])
+
+            for query in first.captured_queries + second.captured_queries:
+                plan = self.explain(query["sql"])
+                with self.subTest(params=params, sql=query["sql"]):
+                    self.assertEqual(
+                        [], self.plan_problems(query["sql"], plan), plan
+                    )
@@ -1,7 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from store.logic import set_rating
+from store.logic import rebuild_counters, set_rating
 from store.models import Book, UserBookRelation
 
 
@@ -34,3 +39,125 @@ class SetRatingTestCase(TestCase):
         self.book_1.refresh_from_db()
 
         self.assertEqual(str(self.book_1.rating), "4.67")
+
+
+class CountersTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user1 = User.objects.create(username="user1")
+        self.user2 = User.objects.create(username="user2")
+        self.book_1 = Book.objects.create(
+            name="Test book_1", price="25", author_name="name1"
+        )
+
+    def assertCounters(
+        self, likes: int, bookmarks: int, rates: int, rates_sum: int
+    ) -> None:
+        self.book_1.refresh_from_db()
+        self.assertEqual(
+            (likes, bookmarks, rates, rates_sum),
+            (
+                self.book_1.likes_count,
+                self.book_1.bookmarks_count,
+                self.book_1.rates_count,
+                self.book_1.rates_sum,
+            ),
+        )
+
+    def test_create_update_delete(self) -> None:
+        relation = UserBookRelation.objects.create(
+            user=self.user1, book=self.book_1, like=True, rate=5
+        )
+        UserBookRelation.objects.create(
+            user=self.user2, book=self.book_1, in_bookmarks=True, rate=3
+        )
+        self.assertCounters(1, 1, 2, 8)
+
+        relation = UserBookRelation.objects.get(pk=relation.pk)
+        relation.like = False
+        relation.in_bookmarks = True
+        relation.rate = 2
+        relation.save()
+        self.assertCounters(0, 2, 2, 5)
+
+        relation.rate = None
+        relation.save()
+        self.assertCounters(0, 2, 1, 3)
+
+        relation.delete()
+        self.assertCounters(0, 1, 1, 3)
+
+    def test_update_fields(self) -> None:
+        relation = UserBookRelation.objects.create(
+            user=self.user1, book=self.book_1, rate=5
+        )
+        relation.like = True
+        relation.rate = 1
+        with CaptureQueriesContext(connection) as queries:
+            relation.save(update_fields=["like"])
+        #  the relation UPDATE writes `like` only, the rate is not counted
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn("rate", queries[0]["sql"].split("WHERE")[0])
+        self.assertNotIn("rating", queries[1]["sql"])
+        self.assertCounters(1, 0, 1, 5)
+        self.assertEqual(UserBookRelation.objects.get(pk=relation.pk).rate, 5)
+
+        relation.save(update_fields=["rate"])
+        self.assertCounters(1, 0, 1, 1)
+
+    def test_user_delete(self) -> None:
+        UserBookRelation.objects.create(
+            user=self.user1, book=self.book_1, like=True, rate=4
+        )
+        UserBookRelation.objects.create(
+            user=self.user2, book=self.book_1, like=True
+        )
+
+        self.user1.delete()
+        self.assertCounters(1, 0, 0, 0)
+
+    def test_rebuild_counters(self) -> None:
+        UserBookRelation.objects.create(
+            user=self.user1, book=self.book_1, like=True, rate=4
+        )
+        Book.objects.filter(pk=self.book_1.pk).update(
+            likes_count=7, rates_sum=0
+        )
+        out = StringIO()
+
+        call_command("rebuild_book_counters", "--dry-run", stdout=out)
+        self.assertIn(
+            f"Book {self.book_1.id}: likes_count 7 -> 1, rates_sum 0 -> 4",
+            out.getvalue(),
+        )
+        self.assertCounters(7, 0, 1, 0)
+
+        call_command("rebuild_book_counters", stdout=StringIO())
+        self.assertCounters(1, 0, 1, 4)
+        self.assertEqual([], rebuild_counters())
+
+    def test_rating(self) -> None:
+        relation = UserBookRelation.objects.create(
+            user=self.user1, book=self.book_1, rate=5
+        )
+        UserBookRelation.objects.create(
+            user=self.user2, book=self.book_1, rate=2
+        )
+        self.book_1.refresh_from_db()
+        self.assertEqual(str(self.book_1.rating), "3.50")
+
+        relation.rate = 3
+        with CaptureQueriesContext(connection) as queries:
+            relation.save()
+        #  relation UPDATE plus a single book UPDATE, no aggregation
+        self.assertEqual(len(queries), 2)
+        self.book_1.refresh_from_db()
+        self.assertEqual(str(self.book_1.rating), "2.50")
+
+        relation.rate = None
+        relation.save()
+        self.book_1.refresh_from_db()
+        self.assertEqual(str(self.book_1.rating), "2.00")
+
+        UserBookRelation.objects.filter(user=self.user2).delete()
+        self.book_1.refresh_from_db()
+        self.assertIsNone(self.book_1.rating)
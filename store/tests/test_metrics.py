@@ -0,0 +1,98 @@
+from unittest.mock import patch
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.metrics import QueryBudgetExceeded, registry
+from store.middleware import QueryMetricsMiddleware
+from store.models import Book, UserBookRelation
+from store.views import BookViewSet
+
+
+class QueryMetricsTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username="test username")
+        self.book = Book.objects.create(
+            name="Test book", price="25", author_name="Author", owner=self.user
+        )
+        UserBookRelation.objects.create(user=self.user, book=self.book)
+        cache.clear()
+        registry.reset()
+
+    def test_route_metrics(self) -> None:
+        self.client.get(reverse("book-list"))
+        self.client.get(reverse("book-list"), data={"fields": "id"})
+
+        queries = registry.get("db_queries", "book-list")
+        self.assertEqual(2, queries.count)
+        self.assertEqual(3, queries.sum)
+        for metric in ("db_seconds", "serializer_seconds", "request_seconds"):
+            histogram = registry.get(metric, "book-list")
+            self.assertEqual(2, histogram.count)
+            self.assertGreater(histogram.sum, 0)
+
+    def test_metrics_endpoint(self) -> None:
+        self.client.get(reverse("book-detail", args=(self.book.id,)))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        self.assertIn("# TYPE store_db_queries histogram", content)
+        self.assertIn(
+            'store_db_queries_bucket{route="book-detail",le="1"} 0', content
+        )
+        self.assertIn(
+            'store_db_queries_bucket{route="book-detail",le="2"} 1', content
+        )
+        self.assertIn('store_db_queries_count{route="book-detail"} 1', content)
+        self.assertNotIn('route="metrics"', content)
+
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_query_budget(self) -> None:
+        url = reverse("book-list")
+        with patch.dict(BookViewSet.query_budgets, {"list": 1}):
+            with override_settings(QUERY_BUDGET_ACTION="raise"):
+                with self.assertRaisesMessage(
+                    QueryBudgetExceeded, "book-list ran 2 queries"
+                ):
+                    self.client.get(url)
+
+            #  the rows cached above would save the readers query
+            cache.clear()
+            with override_settings(QUERY_BUDGET_ACTION="log"):
+                with self.assertLogs("store.metrics", "WARNING"):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            cache.clear()
+            with override_settings(QUERY_BUDGET_ACTION=""):
+                with self.assertNoLogs("store.metrics"):
+                    self.client.get(url)
+
+    def test_query_budget_error_response(self) -> None:
+        url = reverse("book-detail", args=(0,))
+        with patch.dict(BookViewSet.query_budgets, {"retrieve": 0}):
+            with override_settings(QUERY_BUDGET_ACTION="raise"):
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_route_metrics(self) -> None:
+        async def get_response(request: HttpRequest) -> HttpResponse:
+            return HttpResponse()
+
+        self.assertTrue(
+            iscoroutinefunction(QueryMetricsMiddleware(get_response))
+        )
+        response = await self.async_client.get(reverse("async-book-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = registry.get("db_queries", "async-book-list")
+        self.assertEqual(1, queries.count)
+        self.assertEqual(2, queries.sum)
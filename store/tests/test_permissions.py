@@ -0,0 +1,65 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpRequest
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from store.models import Book
+from store.permissions import IsOwnerOrStaffOrReadOnly
+
+
+class IsOwnerOrStaffOrReadOnlyTestCase(TestCase):
+    def setUp(self) -> None:
+        self.owner = User.objects.create(username="owner")
+        self.user = User.objects.create(username="user")
+        self.staff = User.objects.create(username="staff", is_staff=True)
+        self.book_1 = Book.objects.create(
+            name="Test book_1", price=25, author_name="A", owner=self.owner
+        )
+        self.book_2 = Book.objects.create(
+            name="Test book_2", price=55, author_name="B", owner=self.user
+        )
+        self.book_3 = Book.objects.create(
+            name="Test book_3", price=55, author_name="C"
+        )
+        self.permission = IsOwnerOrStaffOrReadOnly()
+
+    def request(self, method: str, user: User) -> HttpRequest:
+        request = getattr(APIRequestFactory(), method)("/")
+        request.user = user
+        return request
+
+    def test_has_object_permission(self) -> None:
+        #  the owner is not loaded
+        book = Book.objects.get(id=self.book_1.id)
+        with self.assertNumQueries(0):
+            for method, user, allowed in (
+                ("get", AnonymousUser(), True),
+                ("put", AnonymousUser(), False),
+                ("put", self.owner, True),
+                ("delete", self.user, False),
+                ("patch", self.staff, True),
+            ):
+                self.assertEqual(
+                    allowed,
+                    self.permission.has_object_permission(
+                        self.request(method, user), None, book
+                    ),
+                )
+
+    def test_filter_editable(self) -> None:
+        books = Book.objects.order_by("id")
+        for user, expected in (
+            (AnonymousUser(), []),
+            (self.owner, [self.book_1]),
+            (self.user, [self.book_2]),
+            (self.staff, [self.book_1, self.book_2, self.book_3]),
+        ):
+            with self.assertNumQueries(1 if expected else 0):
+                self.assertEqual(
+                    expected,
+                    list(
+                        self.permission.filter_editable(
+                            self.request("delete", user), books
+                        )
+                    ),
+                )
@@ -0,0 +1,152 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from store import rating_queue
+from store.models import Book, PendingRatingUpdate, UserBookRelation
+
+
+@override_settings(
+    RATING_UPDATES="deferred",
+    RATING_QUEUE_BACKEND="store.rating_queue.MemoryRatingQueue",
+)
+class MemoryRatingQueueTestCase(TestCase):
+    def setUp(self) -> None:
+        rating_queue.flush()
+        self.users = [
+            User.objects.create(username=f"user{index}") for index in range(3)
+        ]
+        self.book_1 = Book.objects.create(
+            name="Test book_1", price="25", author_name="name1"
+        )
+        self.book_2 = Book.objects.create(
+            name="Test book_2", price="55", author_name="name2"
+        )
+
+    def test_coalesce(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            for user, rate in zip(self.users, (5, 5, 4)):
+                UserBookRelation.objects.create(
+                    user=user, book=self.book_1, like=True, rate=rate
+                )
+            UserBookRelation.objects.create(
+                user=self.users[0], book=self.book_2, rate=3
+            )
+
+        self.book_1.refresh_from_db()
+        self.assertIsNone(self.book_1.rating)
+        self.assertEqual(self.book_1.likes_count, 3)
+        self.assertEqual(len(rating_queue.get_queue()), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(rating_queue.flush(), 2)
+        #  the books locked, one grouped aggregate and one bulk UPDATE
+        #  for both, in a savepoint
+        self.assertEqual(len(queries), 5)
+        if connection.features.has_select_for_update:
+            self.assertTrue(queries[1]["sql"].endswith("FOR UPDATE"))
+
+        self.book_1.refresh_from_db()
+        self.book_2.refresh_from_db()
+        self.assertEqual(str(self.book_1.rating), "4.67")
+        self.assertEqual(self.book_1.rates_count, 3)
+        self.assertEqual(self.book_1.rates_sum, 14)
+        self.assertEqual(str(self.book_2.rating), "3.00")
+
+    def test_unrate(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            relation = UserBookRelation.objects.create(
+                user=self.users[0], book=self.book_1, rate=5
+            )
+        rating_queue.flush()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            relation.rate = None
+            relation.save()
+        rating_queue.flush()
+
+        self.book_1.refresh_from_db()
+        self.assertIsNone(self.book_1.rating)
+        self.assertEqual(self.book_1.rates_count, 0)
+
+    def test_rollback(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                UserBookRelation.objects.create(
+                    user=self.users[0], book=self.book_1, rate=5
+                )
+                raise RuntimeError
+
+        self.assertEqual(len(rating_queue.get_queue()), 0)
+
+    @patch("store.rating_queue.close_old_connections")
+    @patch("store.rating_queue.time.sleep")
+    def test_worker_failure(self, sleep, close) -> None:
+        class Stop(BaseException):
+            pass
+
+        queue = rating_queue.get_queue()
+        queue._worker = "running"
+        with patch(
+            "store.rating_queue.flush", side_effect=[RuntimeError, 1, Stop]
+        ) as flush, self.assertLogs("store.rating_queue", "ERROR"):
+            with self.assertRaises(Stop):
+                queue._run_worker(1)
+
+        #  the loop outlived the failed flush, and a stopped worker is
+        #  replaced on the next push
+        self.assertEqual(flush.call_count, 3)
+        self.assertIsNone(queue._worker)
+
+
+@override_settings(
+    RATING_UPDATES="deferred",
+    RATING_QUEUE_BACKEND="store.rating_queue.DatabaseRatingQueue",
+)
+class DatabaseRatingQueueTestCase(TestCase):
+    def test_coalesce(self) -> None:
+        book = Book.objects.create(
+            name="Test book_1", price="25", author_name="name1"
+        )
+        for index, rate in enumerate((1, 2, 4)):
+            user = User.objects.create(username=f"user{index}")
+            UserBookRelation.objects.create(user=user, book=book, rate=rate)
+
+        self.assertEqual(PendingRatingUpdate.objects.count(), 1)
+        self.assertEqual(rating_queue.flush(), 1)
+        self.assertFalse(PendingRatingUpdate.objects.exists())
+
+        book.refresh_from_db()
+        self.assertEqual(str(book.rating), "2.33")
+
+
+class BatchedRatingsTestCase(TestCase):
+    def test_batched(self) -> None:
+        users = [User.objects.create(username=f"user{i}") for i in range(3)]
+        books = [
+            Book.objects.create(name=name, price="25", author_name="name")
+            for name in ("Test book_1", "Test book_2")
+        ]
+
+        with rating_queue.batched():
+            for user, rate in zip(users, (5, 5, 4)):
+                UserBookRelation.objects.create(
+                    user=user, book=books[0], like=True, rate=rate
+                )
+            with rating_queue.batched():
+                UserBookRelation.objects.create(
+                    user=users[0], book=books[1], rate=3
+                )
+            books[0].refresh_from_db()
+            self.assertIsNone(books[0].rating)
+            self.assertEqual(books[0].likes_count, 3)
+        self.assertFalse(PendingRatingUpdate.objects.exists())
+
+        for book, rating in zip(books, ("4.67", "3.00")):
+            book.refresh_from_db()
+            self.assertEqual(str(book.rating), rating)
+        self.assertEqual(books[0].rates_count, 3)
+        self.assertEqual(books[0].rates_sum, 14)
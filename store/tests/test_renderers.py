@@ -0,0 +1,85 @@
+import io
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from store.models import Book
+from store.parsers import ORJSONParser
+from store.renderers import ORJSONRenderer
+from store.serializers import BooksSerializer
+
+
+class ORJSONRendererTestCase(TestCase):
+    def test_same_output(self) -> None:
+        book = Book.objects.create(
+            name="Книга one", price="25.10", author_name="Author 1"
+        )
+        payloads = [
+            BooksSerializer(Book.objects.all(), many=True).data,
+            OrderedDict(
+                [
+                    ("price", Decimal("25.10")),
+                    ("rating", None),
+                    (
+                        "created",
+                        datetime(
+                            2023, 10, 1, 12, 30, 5, 123456, tzinfo=timezone.utc
+                        ),
+                    ),
+                    ("naive", datetime(2023, 10, 1, 12, 30)),
+                    ("day", date(2023, 10, 1)),
+                    ("at", time(12, 30, 5, 500)),
+                    ("took", timedelta(seconds=1.5)),
+                    ("uuid", UUID(int=book.id)),
+                    ("label", gettext_lazy("Book")),
+                    ("separator", "a\u2028b\u2029c"),
+                    (1, [True, 1.5, "€"]),
+                ]
+            ),
+            [],
+            "",
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                self.assertEqual(
+                    JSONRenderer().render(payload),
+                    ORJSONRenderer().render(payload),
+                )
+
+    def test_indent(self) -> None:
+        data = {"name": "Test book"}
+        self.assertEqual(
+            JSONRenderer().render(data, "application/json; indent=2"),
+            ORJSONRenderer().render(data, "application/json; indent=2"),
+        )
+        self.assertEqual(b"", ORJSONRenderer().render(None))
+
+
+class ORJSONParserTestCase(TestCase):
+    def test_parse(self) -> None:
+        content = '{"book": 1, "name": "Книга", "rate": [5, null]}'
+        for encoding in ("utf-8", "utf-16"):
+            with self.subTest(encoding=encoding):
+                stream = io.BytesIO(content.encode(encoding))
+                self.assertEqual(
+                    JSONParser().parse(
+                        io.BytesIO(content.encode(encoding)),
+                        parser_context={"encoding": encoding},
+                    ),
+                    ORJSONParser().parse(
+                        stream, parser_context={"encoding": encoding}
+                    ),
+                )
+
+    def test_parse_error(self) -> None:
+        for content in (b"{", b'{"rate": NaN}'):
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError):
+                    ORJSONParser().parse(io.BytesIO(content))
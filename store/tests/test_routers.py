@@ -0,0 +1,137 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.cache import BOOK_ROW_KEY, LIST_MODIFIED_KEY
+from store.models import Book, UserBookRelation
+from store.routers import (
+    PrimaryReplicaRouter,
+    replica_configured,
+    replica_reads,
+)
+
+
+# committed data is visible through the replica, which is a test mirror of
+# "default"; replica_configured() is patched because a mirror is otherwise
+# treated as no replica at all
+@patch("store.routers.replica_configured", return_value=True)
+class PrimaryReplicaRoutingTestCase(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username="test username")
+        self.book = Book.objects.create(
+            name="Test book", price="25", author_name="Author"
+        )
+
+    def capture(self) -> tuple:
+        return (
+            CaptureQueriesContext(connections["default"]),
+            CaptureQueriesContext(connections["replica"]),
+        )
+
+    def test_reads_from_replica(self, configured) -> None:
+        primary, replica = self.capture()
+        with primary, replica:
+            response = self.client.get(reverse("book-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.book.id, response.data[0]["id"])
+        self.assertEqual(0, len(primary))
+        self.assertEqual(2, len(replica))
+
+        primary, replica = self.capture()
+        with primary, replica:
+            response = self.client.get(reverse("book-export"))
+            b"".join(response.streaming_content)
+        self.assertEqual(0, len(primary))
+        self.assertEqual(1, len(replica))
+
+    def test_replica_reads_cached(self, configured) -> None:
+        url = reverse("book-list")
+        key = BOOK_ROW_KEY.format("full", self.book.id)
+        #  right after a change the replica may not have replayed it yet
+        self.client.get(url)
+        self.assertIsNone(cache.get(key))
+        primary, replica = self.capture()
+        with primary, replica:
+            self.client.get(url)
+        self.assertEqual(2, len(replica))
+
+        #  later replica reads fill both caches
+        cache.set(LIST_MODIFIED_KEY, int(time.time()) - 60, timeout=None)
+        self.client.get(url)
+        self.assertIsNotNone(cache.get(key))
+        primary, replica = self.capture()
+        with primary, replica:
+            self.client.get(url)
+        self.assertEqual(0, len(replica))
+
+    def test_writes_to_primary_and_pins_user(self, configured) -> None:
+        self.client.force_authenticate(self.user)
+        url = reverse("userbookrelation-detail", args=(self.book.id,))
+        primary, replica = self.capture()
+        with primary, replica:
+            response = self.client.patch(url, data={"rate": 4}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(0, len(replica))
+        self.assertTrue(
+            any("UPDATE" in query["sql"] for query in primary.captured_queries)
+        )
+
+        #  the user who just rated reads their own write from the primary
+        primary, replica = self.capture()
+        with primary, replica:
+            response = self.client.get(
+                reverse("book-detail", args=(self.book.id,))
+            )
+        self.assertEqual("4.00", response.data["rating"])
+        self.assertEqual(0, len(replica))
+
+        #  other users still read from the replica
+        self.client.force_authenticate(
+            User.objects.create(username="other user")
+        )
+        primary, replica = self.capture()
+        with primary, replica:
+            self.client.get(reverse("book-detail", args=(self.book.id,)))
+        self.assertEqual(0, len(primary))
+        self.assertGreater(len(replica), 0)
+
+    def test_save_replica_instance(self, configured) -> None:
+        relation = UserBookRelation.objects.create(
+            user=self.user, book=self.book, rate=4
+        )
+        with replica_reads():
+            relation = UserBookRelation.objects.get(pk=relation.pk)
+        self.assertEqual("replica", relation._state.db)
+
+        relation.rate = 2
+        primary, replica = self.capture()
+        with primary, replica:
+            relation.save()
+        self.assertEqual(0, len(replica))
+        self.book.refresh_from_db()
+        self.assertEqual(2, self.book.rates_sum)
+
+    def test_router(self, configured) -> None:
+        router = PrimaryReplicaRouter()
+        self.assertEqual("default", router.db_for_read(Book))
+        self.assertEqual("default", router.db_for_write(UserBookRelation))
+        self.assertFalse(router.allow_migrate("replica", "store"))
+
+
+class ReplicaConfiguredTestCase(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def test_mirror_is_not_a_replica(self) -> None:
+        self.assertFalse(replica_configured())
@@ -59,7 +59,7 @@ class BooksSerializerTestCase(TestCase):
                 "price": "25.00",
                 "author_name": "name1",
                 "annotated_likes": 3,
-                "rating": "5.00",
+                "rating": "4.67",
                 "owner_name": "user1",
                 "readers": [
                     {
@@ -72,6 +72,9 @@ class BooksSerializerTestCase(TestCase):
                     },
                     {"first_name": "1", "last_name": "2"},
                 ],
+                "is_liked": False,
+                "in_bookmarks": False,
+                "my_rate": None,
             },
             {
                 "id": book_2.id,
@@ -92,6 +95,9 @@ class BooksSerializerTestCase(TestCase):
                     },
                     {"first_name": "1", "last_name": "2"},
                 ],
+                "is_liked": False,
+                "in_bookmarks": False,
+                "my_rate": None,
             },
         ]
 
@@ -1,49 +1,674 @@
-from django.db.models import Count, Case, When
-from django.http import HttpRequest, HttpResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, router, transaction
+from django.db.models import (
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    QuerySet,
+    prefetch_related_objects,
+)
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, mixins
-from rest_framework.filters import SearchFilter, OrderingFilter
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import (
+    APIException,
+    NotFound,
+    ParseError,
+    ValidationError,
+)
+from rest_framework.filters import OrderingFilter
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 from rest_framework.viewsets import GenericViewSet
 
+from store.cache import (
+    get_book_rows,
+    get_list_cache_key,
+    get_list_version,
+    replica_caught_up,
+)
+from store.filters import BookSearchFilter
+from store.logic import (
+    annotate_user_state,
+    bulk_create_books,
+    bulk_set_relations,
+    bulk_update_books,
+    get_readers_preview,
+)
+from store.metrics import registry
 from store.models import Book, UserBookRelation
+from store.pagination import (
+    KeysetPagination,
+    LibraryPagination,
+    ReadersPagination,
+)
 from store.permissions import IsOwnerOrStaffOrReadOnly
-from store.serializers import BooksSerializer, UserBookRelationSerializer
+from store.renderers import CSVRenderer, JSONLinesRenderer, dumps
+from store.routers import (
+    is_pinned,
+    pin_to_primary,
+    replica_reads_enabled,
+)
+from store.serializers import (
+    BookPreviewSerializer,
+    BookReaderSerializer,
+    BooksSerializer,
+    UserBookRelationBulkSerializer,
+    UserBookRelationSerializer,
+)
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class ReplicaReadsMixin:
+    # `replica_actions` read from the replica unless the user changed
+    # something in the last REPLICA_PIN_SECONDS; successful writes of any
+    # action pin the user to the primary
+    replica_actions = ()
+    _replica_token = None
+
+    def initial(self, request: Request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions and not is_pinned(request.user):
+            self._replica_token = replica_reads_enabled.set(True)
+
+    def dispatch(self, request: HttpRequest, *args, **kwargs) -> Response:
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            #  also after exceptions DRF does not turn into responses
+            if self._replica_token is not None:
+                replica_reads_enabled.reset(self._replica_token)
+                self._replica_token = None
+
+    def finalize_response(
+        self, request: Request, response: Response, *args, **kwargs
+    ) -> Response:
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class BookViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     queryset = books = (
-        Book.objects.annotate(
-            annotated_likes=Count(Case(When(relation__like=True, then=1))),
-        )
-        .select_related("owner")
+        Book.objects.select_related("owner")
         .prefetch_related("readers")
         .order_by("id")
     )
     serializer_class = BooksSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, BookSearchFilter, OrderingFilter]
     permission_classes = [IsOwnerOrStaffOrReadOnly]
     filterset_fields = ["price"]
     search_fields = ["name", "author_name"]
     ordering_fields = ["price", "author_name"]
+    #  queries per action, including the session and user lookups of a
+    #  logged-in request; see store.middleware.QueryMetricsMiddleware
+    query_budgets = {"list": 4, "retrieve": 4, "readers": 4, "export": 3}
+    replica_actions = ("list", "retrieve", "readers", "export")
+    #  actions answering with the requesting user's relation to each book
+    user_state_actions = ("list", "retrieve")
+    user_state = False
+    readers_mode_param = "readers"
+    readers_modes = ("full", "preview")
+    readers_mode = "full"
+    fields_param = "fields"
+    omit_param = "omit"
+    sparse_fields = None
+    export_fields = (
+        "id",
+        "name",
+        "price",
+        "author_name",
+        "annotated_likes",
+        "rating",
+        "owner_name",
+    )
+    #  columns behind serializer fields that are not named after one;
+    #  owner_name also needs the owner join, readers* their own queries
+    field_columns = {
+        "annotated_likes": ["likes_count"],
+        "owner_name": ["owner__username"],
+        "readers": [],
+        "readers_count": [],
+        "readers_preview": [],
+        "is_liked": [],
+        "in_bookmarks": [],
+        "my_rate": [],
+    }
+
+    def initial(self, request: Request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        #  decided here rather than in get_queryset, which AsyncBookView
+        #  calls without resolving the user
+        self.user_state = (
+            self.action in self.user_state_actions
+            and request.user.is_authenticated
+        )
+
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+        if self.user_state:
+            queryset = annotate_user_state(queryset, self.request.user)
+        return queryset
+
+    def list(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        #  anonymous responses are shared; users get fresh data
+        if request.user.is_authenticated:
+            return self.list_books(request)
+
+        version, modified = get_list_version()
+        key = get_list_cache_key(
+            version, request.get_host(), request.query_params
+        )
+        etag = f'"{key.rsplit(":", 1)[-1]}-{version}"'
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified
+        )
+        if response is None:
+            data = cache.get(key)
+            if data is None:
+                data = self.list_books(request).data
+                if replica_caught_up():
+                    cache.set(
+                        key,
+                        data,
+                        getattr(settings, "BOOK_LIST_CACHE_TIMEOUT", 300),
+                    )
+            response = Response(data)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(modified)
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ("Authorization", "Cookie"))
+        return response
+
+    def get_readers_mode(self, request: Request) -> str:
+        mode = request.query_params.get(self.readers_mode_param) or getattr(
+            settings, "BOOK_READERS_MODE", "full"
+        )
+        if mode not in self.readers_modes:
+            raise ValidationError(
+                {
+                    self.readers_mode_param: [
+                        f"Expected one of: {', '.join(self.readers_modes)}."
+                    ]
+                }
+            )
+        return mode
+
+    def get_sparse_fields(self, request: Request) -> set | None:
+        #  `?fields=a,b` keeps, `?omit=c` drops serializer fields;
+        #  None when the client asked for every field
+        available = set(self.get_serializer_class().Meta.fields)
+        selected = {}
+        for param in (self.fields_param, self.omit_param):
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            names = {name.strip() for name in value.split(",")} - {""}
+            unknown = names - available
+            if unknown:
+                raise ValidationError(
+                    {param: [f"Unknown fields: {', '.join(sorted(unknown))}."]}
+                )
+            selected[param] = names
+        if not selected:
+            return None
+        fields = selected.get(self.fields_param, available)
+        return fields - selected.get(self.omit_param, set())
+
+    def prune_queryset(
+        self, queryset: QuerySet, fields: set, request: Request
+    ) -> QuerySet:
+        columns = {"id"}
+        for name in fields:
+            columns.update(self.field_columns.get(name, [name]))
+        #  keyset pagination reads the ordering fields of the page edges
+        for backend in self.filter_backends:
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, self)
+                columns.update(field.lstrip("-") for field in ordering or ())
+        if "owner_name" not in fields:
+            queryset = queryset.select_related(None)
+        return queryset.only(*columns)
+
+    def get_serializer_class(self) -> type[Serializer]:
+        if self.readers_mode == "preview":
+            return BookPreviewSerializer
+        return super().get_serializer_class()
+
+    def list_books(self, request: Request) -> Response:
+        self.readers_mode = self.get_readers_mode(request)
+        self.sparse_fields = self.get_sparse_fields(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        #  readers are prefetched only for books missing from the row cache
+        queryset = queryset.prefetch_related(None)
+        if self.sparse_fields is not None:
+            queryset = self.prune_queryset(
+                queryset, self.sparse_fields, request
+            )
+        page = self.paginate_queryset(queryset)
+        books = page if page is not None else list(queryset)
+        if self.sparse_fields is not None:
+            #  sparse rows are cheap to build and not worth caching
+            data = self.render_books(books)
+        else:
+            data = get_book_rows(books, self.render_books, self.readers_mode)
+        self.add_user_state(books, data)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_row_fields(self) -> set:
+        #  requested fields that are the same for every user
+        meta = self.get_serializer_class().Meta
+        fields = self.sparse_fields
+        if fields is None:
+            fields = set(meta.fields)
+        return fields - set(meta.user_state_fields)
+
+    def add_user_state(self, books: list, rows: list) -> None:
+        meta = self.get_serializer_class().Meta
+        fields = set(meta.user_state_fields)
+        if self.sparse_fields is not None:
+            fields &= self.sparse_fields
+        if not fields:
+            return
+        serializer = self.get_serializer_class()(many=True, fields=fields)
+        for row, state in zip(rows, serializer.to_representation(books)):
+            row.update(state)
+
+    def render_books(self, books: list) -> list:
+        fields = self.get_row_fields()
+        if "readers_count" in fields or "readers_preview" in fields:
+            size = getattr(settings, "BOOK_READERS_PREVIEW_SIZE", 5)
+            previews = get_readers_preview([book.id for book in books], size)
+            for book in books:
+                book.readers_count, book.readers_preview = previews.get(
+                    book.id, (0, [])
+                )
+        elif "readers" in fields:
+            prefetch_related_objects(books, "readers")
+        return self.get_serializer(books, many=True, fields=fields).data
+
+    @action(detail=False, renderer_classes=[JSONLinesRenderer, CSVRenderer])
+    def export(self, request: Request) -> StreamingHttpResponse:
+        #  the whole filtered catalogue, one row at a time: a server-side
+        #  cursor keeps at most `chunk_size` books in memory
+        fields = set(self.export_fields)
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.prefetch_related(None)
+        queryset = self.prune_queryset(queryset, fields, request)
+        #  rows are read after the view returned, so the alias is fixed now
+        queryset = queryset.using(router.db_for_read(Book))
+        chunk_size = getattr(settings, "BOOK_EXPORT_CHUNK_SIZE", 2000)
+        serializer = BooksSerializer(fields=fields)
+        rows = (
+            serializer.to_representation(book)
+            for book in queryset.iterator(chunk_size=chunk_size)
+        )
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.render_stream(rows, list(self.export_fields)),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="books.{renderer.format}"'
+        )
+        return response
+
+    @action(
+        detail=True,
+        pagination_class=ReadersPagination,
+        filter_backends=[],
+    )
+    def readers(self, request: Request, pk: str = None) -> Response:
+        book = get_object_or_404(Book.objects.only("id"), pk=pk)
+        relations = UserBookRelation.objects.filter(book=book).select_related(
+            "user"
+        )
+        page = self.paginate_queryset(relations)
+        serializer = BookReaderSerializer(
+            [relation.user for relation in page], many=True
+        )
+        return self.get_paginated_response(serializer.data)
 
     def perform_create(self, serializer: Serializer) -> None:
         serializer.save(owner=self.request.user)
 
+    def create(self, request: Request, *args, **kwargs) -> Response:
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+        return super().create(request, *args, **kwargs)
+
+    #  list-form POST, PATCH and DELETE on /book/ report one result per
+    #  item, in request order; see BulkRouter for the PATCH/DELETE routes
+    def get_bulk_items(self, request: Request) -> list:
+        if not request.user.is_authenticated:
+            self.permission_denied(request)
+        if not isinstance(request.data, list):
+            raise ParseError("Expected a list of books.")
+        return request.data
+
+    def validate_bulk_items(
+        self, items: list, results: list, partial: bool = False
+    ) -> list:
+        #  [(index, validated data), ...] of valid items; invalid ones get
+        #  their result. One serializer validates the whole batch
+        serializer = self.get_serializer(partial=partial)
+        valid = []
+        for index, item in enumerate(items):
+            if results[index] is not None:
+                continue
+            try:
+                valid.append((index, serializer.run_validation(item)))
+            except ValidationError as exc:
+                results[index] = {
+                    "id": item.get("id") if isinstance(item, dict) else None,
+                    "status": "invalid",
+                    "errors": exc.detail,
+                }
+        return valid
 
-class UserBookRelationView(mixins.UpdateModelMixin, GenericViewSet):
+    def get_bulk_books(self, request: Request, ids: set, *fields: str) -> dict:
+        #  {id: book} of the existing books among `ids`, with `editable`
+        #  checked by the permissions in the same query
+        books = Book.objects.filter(id__in=ids)
+        editable = books
+        for permission in self.get_permissions():
+            if hasattr(permission, "filter_editable"):
+                editable = permission.filter_editable(request, editable)
+        if fields:
+            books = books.only(*fields)
+        return books.annotate(
+            editable=Exists(editable.filter(pk=OuterRef("pk")))
+        ).in_bulk()
+
+    @staticmethod
+    def get_bulk_id(item: dict) -> int | None:
+        book_id = item.get("id") if isinstance(item, dict) else item
+        if isinstance(book_id, int) and not isinstance(book_id, bool):
+            return book_id
+        return None
+
+    def resolve_bulk_ids(
+        self, request: Request, items: list, results: list, *fields: str
+    ) -> dict:
+        #  books the user may change, by id; other items get their result
+        for index, item in enumerate(items):
+            if self.get_bulk_id(item) is None:
+                results[index] = {
+                    "id": None,
+                    "status": "invalid",
+                    "errors": {"id": ["A valid integer is required."]},
+                }
+        ids = {self.get_bulk_id(item) for item in items} - {None}
+        books = self.get_bulk_books(request, ids, *fields)
+        for index, item in enumerate(items):
+            book_id = self.get_bulk_id(item)
+            if results[index] is not None:
+                continue
+            if book_id not in books:
+                results[index] = {"id": book_id, "status": "not_found"}
+            elif not books[book_id].editable:
+                results[index] = {"id": book_id, "status": "forbidden"}
+        return {
+            book_id: book for book_id, book in books.items() if book.editable
+        }
+
+    def bulk_create(self, request: Request) -> Response:
+        items = self.get_bulk_items(request)
+        results = [None] * len(items)
+        valid = self.validate_bulk_items(items, results)
+        chunk_size = getattr(settings, "BOOK_BULK_CHUNK_SIZE", 500)
+        books = bulk_create_books(
+            request.user, [data for _, data in valid], chunk_size
+        )
+        for (index, _), book in zip(valid, books):
+            results[index] = {"id": book.id, "status": "created"}
+        return Response(results)
+
+    def bulk_update(self, request: Request) -> Response:
+        items = self.get_bulk_items(request)
+        results = [None] * len(items)
+        books = self.resolve_bulk_ids(request, items, results)
+        valid = self.validate_bulk_items(items, results, partial=True)
+
+        #  repeated books are merged with the later values winning
+        changes = {}
+        for index, data in valid:
+            book_id = self.get_bulk_id(items[index])
+            changes.setdefault(book_id, {}).update(data)
+            results[index] = {"id": book_id, "status": "updated"}
+        chunk_size = getattr(settings, "BOOK_BULK_CHUNK_SIZE", 500)
+        bulk_update_books(
+            [(books[book_id], values) for book_id, values in changes.items()],
+            chunk_size,
+        )
+        return Response(results)
+
+    def bulk_destroy(self, request: Request) -> Response:
+        #  the body is a list of book ids, or of {"id": ...} objects like
+        #  the items of a bulk update
+        items = self.get_bulk_items(request)
+        results = [None] * len(items)
+        books = self.resolve_bulk_ids(request, items, results, "id")
+        with transaction.atomic():
+            Book.objects.filter(id__in=books).delete()
+        for index, item in enumerate(items):
+            if results[index] is None:
+                results[index] = {
+                    "id": self.get_bulk_id(item),
+                    "status": "deleted",
+                }
+        return Response(results)
+
+
+class LibraryView(BookViewSet):
+    # the requesting user's bookmarked, liked or rated books in the payload
+    # of the book list, by the user's relation, the newest first. Pages are
+    # read from the user's partial indexes on the relation table, so they
+    # cost the same for any catalogue size. Routed with `list` only
+    permission_classes = [IsAuthenticated]
+    pagination_class = LibraryPagination
+    filter_backends = []
+    #  shelf: condition on the user's relation; it is read through
+    #  aliases of the relation annotate_user_state joins, a filter across
+    #  the relation would join it a second time
+    shelves = {
+        "bookmarks": Q(relation_in_bookmarks=True),
+        "likes": Q(relation_like=True),
+        "rated": Q(relation_rate__isnull=False),
+    }
+    shelf = None
+
+    def get_queryset(self) -> QuerySet:
+        return (
+            super()
+            .get_queryset()
+            .alias(
+                relation_in_bookmarks=F("my_relation__in_bookmarks"),
+                relation_like=F("my_relation__like"),
+                relation_rate=F("my_relation__rate"),
+            )
+            .filter(self.shelves[self.shelf])
+            .annotate(relation_id=F("my_relation__id"))
+        )
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        return self.list_books(request)
+
+
+class UserBookRelationView(
+    ReplicaReadsMixin, mixins.UpdateModelMixin, GenericViewSet
+):
     permission_classes = [IsAuthenticated]
     queryset = UserBookRelation.objects.all()
     serializer_class = UserBookRelationSerializer
     lookup_field = "book"
+    lookup_value_regex = r"\d+"
+    query_budgets = {"update": 10, "partial_update": 10}
+
+    def update(self, request: Request, *args, **kwargs) -> Response:
+        #  the relation stays locked from get_object until the counters
+        #  are updated, so concurrent PATCHes compute their deltas from
+        #  each other's results
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
 
     def get_object(self) -> UserBookRelation:
-        obj, _ = UserBookRelation.objects.get_or_create(
-            user=self.request.user, book_id=self.kwargs["book"]
+        user, book_id = self.request.user, self.kwargs["book"]
+        relation = (
+            UserBookRelation.objects.select_for_update()
+            .filter(user=user, book_id=book_id)
+            .first()
         )
-        return obj
+        if relation is not None:
+            return relation
+        if not Book.objects.filter(pk=book_id).exists():
+            raise NotFound()
+        #  inserted together with the PATCHed values by perform_update
+        return UserBookRelation(user=user, book_id=book_id)
+
+    def perform_update(self, serializer: Serializer) -> None:
+        if not serializer.instance._state.adding:
+            serializer.save()
+            return
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            #  a concurrent request inserted the (user, book) row first;
+            #  a book deleted meanwhile is a 404 from get_object, any
+            #  other violation is not a race
+            relation = self.get_object()
+            if relation._state.adding:
+                raise
+            serializer.instance = relation
+            serializer.save()
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request: Request) -> Response:
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": "Expected a list of relations."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = [None] * len(request.data)
+        valid, positions = [], []
+        for index, item in enumerate(request.data):
+            serializer = UserBookRelationBulkSerializer(data=item)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+                positions.append(index)
+            else:
+                results[index] = {
+                    "book": (
+                        item.get("book") if isinstance(item, dict) else None
+                    ),
+                    "status": "invalid",
+                    "errors": serializer.errors,
+                }
+
+        chunk_size = getattr(settings, "RELATION_BULK_CHUNK_SIZE", 500)
+        statuses = bulk_set_relations(request.user, valid, chunk_size)
+        for index, item_status in zip(positions, statuses):
+            results[index] = item_status
+        return Response(results)
+
+
+async def prefetch_readers(books: list) -> None:
+    #  the prefetching API has no async counterpart yet
+    await sync_to_async(prefetch_related_objects)(books, "readers")
+
+
+class AsyncBookView(View):
+    #  read-only /async/book/ and /async/book/<pk>/ on the async ORM, with
+    #  the filters, ordering and pagination of BookViewSet
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request: HttpRequest, pk: int = None) -> HttpResponse:
+        viewset = BookViewSet(
+            action_map={"get": "list" if pk is None else "retrieve"},
+            args=(),
+            kwargs={"pk": pk} if pk else {},
+            format_kwarg=None,
+        )
+        viewset.request = viewset.initialize_request(request)
+        try:
+            queryset = viewset.filter_queryset(viewset.get_queryset())
+            data = await (
+                self.get_list(viewset, queryset)
+                if pk is None
+                else self.get_detail(queryset, pk)
+            )
+        except APIException as exc:
+            detail = exc.detail
+            if not isinstance(detail, (list, dict)):
+                detail = {"detail": detail}
+            return self.render(detail, exc.status_code)
+        return self.render(data)
+
+    async def get_list(
+        self, viewset: BookViewSet, queryset: QuerySet
+    ) -> list | dict:
+        queryset = queryset.prefetch_related(None)
+        paginator = viewset.paginator
+        page = await paginator.apaginate_queryset(
+            queryset, viewset.request, viewset
+        )
+        if page is None:
+            page = [book async for book in queryset]
+        await prefetch_readers(page)
+        data = BooksSerializer(page, many=True).data
+        if paginator.is_requested(viewset.request):
+            return paginator.get_paginated_response(data).data
+        return data
+
+    async def get_detail(self, queryset: QuerySet, pk: int) -> dict:
+        try:
+            book = await queryset.prefetch_related(None).aget(pk=pk)
+        except Book.DoesNotExist:
+            raise NotFound()
+        await prefetch_readers([book])
+        return BooksSerializer(book).data
+
+    @staticmethod
+    def render(data: list | dict, status_code: int = 200) -> HttpResponse:
+        return HttpResponse(
+            dumps(data), status=status_code, content_type="application/json"
+        )
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    #  per-route histograms of this process, for local scraping only
+    if request.META.get("REMOTE_ADDR") not in settings.INTERNAL_IPS:
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4"
+    )
 
 
 def auth(request: HttpRequest) -> HttpResponse: